@@ -1 +1 @@
-from server.src.engine.table import Engine
+from server.src.engine.table import Engine, OmahaEngine
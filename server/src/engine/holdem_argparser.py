@@ -21,6 +21,7 @@ def parse_lib_args(args):
     hole_cards, board = None, None
     if not args.input:
         hole_cards, board = parse_cards(args.cards, args.board)
+        error_check_exact(hole_cards, args.exact)
     return hole_cards, args.n, args.exact, board, args.input
 
 
@@ -50,11 +51,13 @@ def parse_args():
     hole_cards, board = None, None
     if not args.input:
         hole_cards, board = parse_cards(args.cards, args.board)
+        error_check_exact(hole_cards, args.exact)
     return hole_cards, args.n, args.exact, board, args.input
 
 
 # Parses a line taken from the input file and returns the hole cards and board
-def parse_file_args(line):
+# exact: whether the line is run exactly, which limits its random hands
+def parse_file_args(line, exact=False):
     if line is None or len(line) == 0:
         print(line)
         print("Invalid format")
@@ -71,7 +74,9 @@ def parse_file_args(line):
         board = values[1].split()
         all_cards.extend(board)
     error_check_cards(all_cards)
-    return parse_cards(hole_cards, board)
+    hole_cards, board = parse_cards(hole_cards, board)
+    error_check_exact(hole_cards, exact)
+    return hole_cards, board
 
 
 # Parses hole cards and board
@@ -127,10 +132,18 @@ def error_check_arguments(args):
 
 
 # Checking that the hole cards + board are formatted properly and unique
+# Cards are strings ("As") or integer codes (see holdem_functions.card_to_code)
+# Hand ranges (see holdem_functions.HandRange) may stand in for hole cards
 def error_check_cards(all_cards):
     card_re = re.compile('[AKQJT98765432][scdh]')
     for card in all_cards:
-        if card != "?" and not card_re.match(card):
+        if isinstance(card, int):
+            if not 0 <= card < 52:
+                print("Invalid card given.")
+                exit()
+        elif holdem_functions.is_range_string(card):
+            error_check_range(card)
+        elif card != "?" and not card_re.match(card):
             print("Invalid card given.")
             exit()
         else:
@@ -139,18 +152,44 @@ def error_check_cards(all_cards):
                 exit()
 
 
+# Checking that a hand range is formatted properly
+def error_check_range(range_string):
+    range_re = re.compile('([AKQJT98765432][scdh]){2}|'
+                          '[AKQJT98765432]{2}[so]?'
+                          '(\\+|-[AKQJT98765432]{2}[so]?)?')
+    for item in range_string.split(","):
+        hand, _, weight = item.strip().partition(":")
+        if not range_re.fullmatch(hand):
+            print("Invalid hand range given: " + range_string)
+            exit()
+        try:
+            if weight and float(weight) < 0:
+                raise ValueError
+            holdem_functions.parse_range_item(hand)
+        except (ValueError, KeyError):
+            print("Invalid hand range given: " + range_string)
+            exit()
+
+
 # Returns tuple of two-tuple hole_cards: e.g. ((As, Ks), (Ad, Kd), (Jh, Th))
+# A hand range takes the place of both hole cards of a player and becomes a
+# holdem_functions.HandRange
 def create_hole_cards(raw_hole_cards):
     # Checking that there are an even number of hole cards
-    if (raw_hole_cards is None or len(raw_hole_cards) < 2 or
-            len(raw_hole_cards) % 2):
+    if raw_hole_cards is None or len(raw_hole_cards) < 1:
         print("You must provide a non-zero even number of hole cards")
         exit()
     # Create two-tuples out of hole cards
     hole_cards, current_hole_cards = [], []
     for hole_card in raw_hole_cards:
+        if holdem_functions.is_range_string(hole_card):
+            if current_hole_cards:
+                print("You must provide a non-zero even number of hole cards")
+                exit()
+            hole_cards.append(holdem_functions.HandRange(hole_card))
+            continue
         if hole_card != "?":
-            current_card = holdem_functions.Card(hole_card)
+            current_card = create_card(hole_card)
             current_hole_cards.append(current_card)
         else:
             current_hole_cards.append(None)
@@ -162,11 +201,24 @@ def create_hole_cards(raw_hole_cards):
                     exit()
             hole_cards.append((current_hole_cards[0], current_hole_cards[1]))
             current_hole_cards = []
-    if hole_cards.count((None, None)) > 1:
-        print("Can only have one set of unknown hole cards")
+    if current_hole_cards or not hole_cards:
+        print("You must provide a non-zero even number of hole cards")
+        exit()
     return tuple(hole_cards)
 
 
+# Exact calculations enumerate the holdings of at most one unknown player and
+# can't weigh hand ranges
+def error_check_exact(hole_cards, exact):
+    random_hands = list(filter(holdem_functions.is_random_hand, hole_cards))
+    if exact and (len(random_hands) > 1 or
+                  any([isinstance(hole_card, holdem_functions.HandRange)
+                       for hole_card in random_hands])):
+        print("Exact calculations support one set of unknown hole cards and "
+              "no hand ranges")
+        exit()
+
+
 # Returns list of board cards: e.g. [As Ks Ad Kd]
 def parse_board(board):
     if len(board) > 5 or len(board) < 3:
@@ -178,6 +230,13 @@ def parse_board(board):
     return create_cards(board)
 
 
+# Instantiates a new card from a card string; integer codes are kept as-is
+def create_card(card):
+    if isinstance(card, int):
+        return card
+    return holdem_functions.Card(card)
+
+
 # Instantiates new cards from the arguments and returns them in a tuple
 def create_cards(card_strings):
-    return [holdem_functions.Card(arg) for arg in card_strings]
+    return [create_card(arg) for arg in card_strings]
@@ -0,0 +1,163 @@
+import itertools
+import json
+import os
+from collections import OrderedDict
+
+from server.src.engine import holdem_functions
+from server.src.engine import holdem_preflop
+from server.src.engine import parallel_holdem_calc
+
+# Every way of relabelling the four suits
+suit_permutations = tuple(itertools.permutations(range(4)))
+
+
+# Returns the code of a card after relabelling its suit
+def permute_code(code, permutation):
+    return permutation[code // 13] * 13 + code % 13
+
+
+# Takes hole cards and board (strings, Cards or codes, "?" for unknown cards)
+# and returns (key, order):
+# 1) key: the same for every query that differs only by suit relabelling,
+#    player order, the order of the cards in a hand or on the board
+# 2) order: order[i] is the index of the player at position i of the key
+# Raises ValueError for hands with a single unknown card.
+def canonical_query(hole_cards, board):
+    codes = [None if card in ("?", None) else holdem_functions.card_to_code(card)
+             for card in hole_cards]
+    if not complete_hands(codes):
+        raise ValueError("Unknown hole cards must come in pairs")
+    hands = [(codes[index], codes[index + 1])
+             for index in range(0, len(codes), 2)]
+    board = [holdem_functions.card_to_code(card) for card in board or []]
+    best_key, best_order = None, None
+    for permutation in suit_permutations:
+        permuted_hands = []
+        for index, hand in enumerate(hands):
+            if hand == (None, None):
+                # Sorts unknown hands before every known hand
+                permuted_hands.append(((-1, -1), index))
+            else:
+                permuted_hands.append((tuple(sorted(
+                    [permute_code(code, permutation) for code in hand])),
+                    index))
+        permuted_hands.sort()
+        key = (tuple([hand for hand, _ in permuted_hands]),
+               tuple(sorted([permute_code(code, permutation)
+                             for code in board])))
+        if best_key is None or key < best_key:
+            best_key = key
+            best_order = [index for _, index in permuted_hands]
+    return best_key, best_order
+
+
+# Whether hole cards (None or "?" for unknown cards) form whole hands, each
+# either known or unknown
+def complete_hands(hole_cards):
+    unknown = [card in ("?", None) for card in hole_cards]
+    return len(unknown) % 2 == 0 and all(
+        [unknown[index] == unknown[index + 1]
+         for index in range(0, len(unknown), 2)])
+
+
+# Returns a cache key read back from JSON, with its lists turned back into
+# tuples
+def key_from_json(value):
+    if isinstance(value, list):
+        return tuple([key_from_json(item) for item in value])
+    return value
+
+
+# Bounded LRU cache of equity results in front of holdem_calc.calculate or
+# parallel_holdem_calc.calculate. Queries are normalized with canonical_query,
+# so e.g. AsKs vs QdQc and QhQs vs AdKd share one entry.
+class EquityCache:
+    def __init__(self, max_size=4096, file_name=None):
+        self.max_size = max_size
+        self.file_name = file_name
+        self.entries = OrderedDict()
+        self.hits, self.misses = 0, 0
+        # Entries are read from file_name here and written back by save()
+        if file_name:
+            self.load()
+
+    # Same arguments as holdem_calc.calculate, plus the calculate function to
+    # run on a cache miss. Input files, verbose runs and hand ranges are not
+    # cached, and invalid hands are left to calculate to report.
+    def calculate(self, board, exact, num, input_file, hole_cards, verbose,
+                  calculate=parallel_holdem_calc.calculate):
+        if input_file or verbose or any(map(holdem_functions.is_range_string,
+                                            hole_cards)) or \
+                not complete_hands(hole_cards):
+            return calculate(board, exact, num, input_file, hole_cards,
+                             verbose)
+        # Pre-flop Monte Carlo queries are answered from the precomputed
+        # tables when they cover them with at least num boards
+        if not board and not exact:
+            result = holdem_preflop.lookup(hole_cards, int(num))
+            if result is not None:
+                return result
+        cards_key, order = canonical_query(hole_cards, board)
+        # The number of iterations doesn't change an exact result
+        key = (cards_key, bool(exact), None if exact else int(num),
+               calculate.__module__)
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            canonical_result = self.entries[key]
+        else:
+            self.misses += 1
+            # Run the query in canonical player order and store the result
+            canonical_hole_cards = []
+            for index in order:
+                canonical_hole_cards.extend(hole_cards[2 * index:2 * index + 2])
+            canonical_result = calculate(board, exact, num, None,
+                                         canonical_hole_cards, False)
+            self.entries[key] = canonical_result
+            if len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        # Map the result back to the order the players were given in
+        result = [canonical_result[0]] + [None] * len(order)
+        for position, index in enumerate(order):
+            result[index + 1] = canonical_result[position + 1]
+        return result
+
+    def clear(self):
+        self.entries.clear()
+        self.hits, self.misses = 0, 0
+
+    # Reads the entries saved by a previous run, if there are any. A file
+    # that isn't a saved cache is ignored, as every entry can be recomputed.
+    def load(self):
+        if not os.path.exists(self.file_name):
+            return
+        try:
+            with open(self.file_name) as cache_file:
+                entries = json.load(cache_file)
+        except ValueError:
+            return
+        for key, result in entries:
+            self.entries[key_from_json(key)] = result
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    # Writes the entries to file_name as JSON, least recently used first
+    def save(self):
+        if not self.file_name:
+            return
+        with open(self.file_name, 'w') as cache_file:
+            json.dump(list(self.entries.items()), cache_file)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+# Cache shared by the library level calculate below
+default_cache = EquityCache()
+
+
+# Cached version of holdem_calc.calculate / parallel_holdem_calc.calculate
+def calculate(board, exact, num, input_file, hole_cards, verbose,
+              calculate=parallel_holdem_calc.calculate):
+    return default_cache.calculate(board, exact, num, input_file, hole_cards,
+                                   verbose, calculate)
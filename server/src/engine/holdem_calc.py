@@ -1,4 +1,8 @@
+import functools
 import time
+
+import numpy as np
+
 from server.src.engine import holdem_functions
 from server.src.engine import holdem_argparser
 
@@ -8,29 +12,60 @@ def main():
     run(hole_cards, num, exact, board, file_name, True)
 
 
-def calculate(board, exact, num, input_file, hole_cards, verbose):
+# batch: score boards in NumPy batches instead of one board at a time
+# seed: seed of the Monte Carlo simulations, anything accepted by
+# np.random.default_rng; the same seed reproduces the same results
+def calculate(board, exact, num, input_file, hole_cards, verbose, batch=False,
+              seed=None):
     args = holdem_argparser.LibArgs(board, exact, num, input_file, hole_cards)
     hole_cards, n, e, board, filename = holdem_argparser.parse_lib_args(args)
-    return run(hole_cards, n, e, board, filename, verbose)
+    return run(hole_cards, n, e, board, filename, verbose, batch, seed)
+
+
+# Adaptive Monte Carlo version of calculate: simulates batches of batch_size
+# boards until every percentage is known to within target_error at the given
+# confidence, time_budget seconds have passed or max_iterations boards have
+# been simulated. Returns (percentages, intervals) where intervals holds the
+# (low, high) confidence interval of every percentage.
+def calculate_adaptive(board, hole_cards, target_error=0.005, time_budget=None,
+                       confidence=0.95, verbose=False, batch_size=10000,
+                       max_iterations=10000000, seed=None):
+    args = holdem_argparser.LibArgs(board, False, max_iterations, None,
+                                    hole_cards)
+    hole_cards, _, _, board, _ = holdem_argparser.parse_lib_args(args)
+    deck = holdem_functions.generate_deck(hole_cards, board)
+    return run_adaptive_simulation(hole_cards, board, deck, target_error,
+                                   time_budget, confidence, verbose,
+                                   batch_size, max_iterations, seed)
 
 
-def run(hole_cards, num, exact, board, file_name, verbose):
+def run(hole_cards, num, exact, board, file_name, verbose, batch=False,
+        seed=None):
     if file_name:
+        # One generator for the whole file, so every line gets its own stream
+        rng = np.random.default_rng(seed)
         input_file = open(file_name, 'r')
         for line in input_file:
             if line is not None and len(line.strip()) == 0:
                 continue
-            hole_cards, board = holdem_argparser.parse_file_args(line)
+            hole_cards, board = holdem_argparser.parse_file_args(line, exact)
             deck = holdem_functions.generate_deck(hole_cards, board)
-            run_simulation(hole_cards, num, exact, board, deck, verbose)
+            run_simulation(hole_cards, num, exact, board, deck, verbose, batch,
+                           rng)
             print("-----------------------------------")
         input_file.close()
     else:
         deck = holdem_functions.generate_deck(hole_cards, board)
-        return run_simulation(hole_cards, num, exact, board, deck, verbose)
+        return run_simulation(hole_cards, num, exact, board, deck, verbose,
+                              batch, seed)
 
 
-def run_simulation(hole_cards, num, exact, given_board, deck, verbose):
+def run_simulation(hole_cards, num, exact, given_board, deck, verbose,
+                   batch=False, seed=None):
+    # Simulate on integer card codes rather than Card objects
+    hole_cards = holdem_functions.encode_hole_cards(hole_cards)
+    given_board = holdem_functions.encode_board(given_board)
+    deck = tuple([holdem_functions.card_to_code(card) for card in deck])
     num_players = len(hole_cards)
     # Create results data structures which track results of comparisons
     # 1) result_histograms: a list for each player that shows the number of
@@ -45,11 +80,31 @@ def run_simulation(hole_cards, num, exact, given_board, deck, verbose):
     board_length = 0 if given_board is None else len(given_board)
     # When a board is given, exact calculation is much faster than Monte Carlo
     # simulation, so default to exact if a board is given
-    if exact or given_board is not None:
-        generate_boards = holdem_functions.generate_exhaustive_boards
+    exhaustive = exact or given_board is not None
+    random_hands = list(filter(holdem_functions.is_random_hand, hole_cards))
+    if batch:
+        find_winner = holdem_functions.find_winner_batch
+        if exhaustive:
+            generate_boards = holdem_functions.generate_exhaustive_board_batches
+            # Enumerate one board per class of suit-isomorphic boards
+            find_winner = functools.partial(find_winner, isomorphic=True)
+        else:
+            generate_boards = functools.partial(
+                holdem_functions.generate_random_board_batches, seed=seed)
     else:
-        generate_boards = holdem_functions.generate_random_boards
-    if (None, None) in hole_cards:
+        find_winner = holdem_functions.find_winner
+        if exhaustive:
+            generate_boards = holdem_functions.generate_exhaustive_boards
+        else:
+            generate_boards = functools.partial(
+                holdem_functions.generate_random_boards, seed=seed)
+    if random_hands and not (exhaustive and random_hands == [(None, None)]):
+        # Unknown hands and hand ranges are drawn together with the board
+        holdem_functions.find_winner_random_hands(
+            deck, hole_cards, num, board_length, given_board, winner_list,
+            result_histograms, seed=seed)
+    elif (None, None) in hole_cards:
+        # Enumerate every holding of the only unknown player
         hole_cards_list = list(hole_cards)
         unknown_index = hole_cards.index((None, None))
         for filler_hole_cards in holdem_functions.generate_hole_cards(deck):
@@ -57,20 +112,54 @@ def run_simulation(hole_cards, num, exact, given_board, deck, verbose):
             deck_list = list(deck)
             deck_list.remove(filler_hole_cards[0])
             deck_list.remove(filler_hole_cards[1])
-            holdem_functions.find_winner(generate_boards, tuple(deck_list),
-                                         tuple(hole_cards_list), num,
-                                         board_length, given_board, winner_list,
-                                         result_histograms)
+            find_winner(generate_boards, tuple(deck_list),
+                        tuple(hole_cards_list), num, board_length, given_board,
+                        winner_list, result_histograms)
     else:
-        holdem_functions.find_winner(generate_boards, deck, hole_cards, num,
-                                     board_length, given_board, winner_list,
-                                     result_histograms)
+        find_winner(generate_boards, deck, hole_cards, num, board_length,
+                    given_board, winner_list, result_histograms)
     if verbose:
         holdem_functions.print_results(hole_cards, winner_list,
                                        result_histograms)
     return holdem_functions.find_winning_percentage(winner_list)
 
 
+def run_adaptive_simulation(hole_cards, given_board, deck, target_error,
+                            time_budget, confidence, verbose, batch_size,
+                            max_iterations, seed=None):
+    hole_cards = holdem_functions.encode_hole_cards(hole_cards)
+    given_board = holdem_functions.encode_board(given_board)
+    deck = tuple([holdem_functions.card_to_code(card) for card in deck])
+    num_players = len(hole_cards)
+    board_length = 0 if given_board is None else len(given_board)
+    result_histograms, winner_list = [], [0] * (num_players + 1)
+    for _ in range(num_players):
+        result_histograms.append([0] * len(holdem_functions.hand_rankings))
+    # Every batch continues the same stream
+    rng = np.random.default_rng(seed)
+
+    def simulate_batch(num):
+        if any(map(holdem_functions.is_random_hand, hole_cards)):
+            holdem_functions.find_winner_random_hands(
+                deck, hole_cards, num, board_length, given_board, winner_list,
+                result_histograms, batch_size, rng)
+        else:
+            holdem_functions.find_winner_batch(
+                functools.partial(
+                    holdem_functions.generate_random_board_batches, seed=rng),
+                deck, hole_cards, num, board_length, given_board, winner_list,
+                result_histograms, batch_size)
+
+    intervals = holdem_functions.find_winner_adaptive(
+        simulate_batch, winner_list, target_error, time_budget, confidence,
+        max_iterations, batch_size)
+    if verbose:
+        holdem_functions.print_results(hole_cards, winner_list,
+                                       result_histograms)
+        print("Confidence intervals: ", intervals)
+    return holdem_functions.find_winning_percentage(winner_list), intervals
+
+
 if __name__ == '__main__':
     start = time.time()
     main()
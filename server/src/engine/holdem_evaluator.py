@@ -0,0 +1,262 @@
+import itertools
+
+import numpy as np
+
+# Lookup-table hand evaluator. Every 5, 6 or 7 card hand is mapped to a single
+# integer score; a higher score is a better hand, equal scores are a split.
+# Score layout: hand category (index into holdem_functions.hand_rankings)
+# shifted by HAND_SHIFT, followed by up to five 4-bit card values (2-14)
+# ordered from most to least significant.
+HAND_SHIFT = 20
+# Every card contributes a 3-bit counter slot for its value, so the sum over a
+# hand is a unique key for its value histogram, independent of the suits
+RANK_KEYS = [0, 0] + [1 << (3 * (value - 2)) for value in range(2, 15)]
+RANK_BITS = [0, 0] + [1 << (value - 2) for value in range(2, 15)]
+# Card sets given as 64-bit masks hold one 13-bit block of values per suit:
+# bit (suit_index * 13 + value - 2) is set for every card in the set
+SUIT_MASK = 0x1FFF
+SUIT_SHIFTS = (0, 13, 26, 39)
+# Bit masks of every possible straight mapped to the straight's high card.
+# The wheel (A-2-3-4-5) is a five high straight.
+STRAIGHT_MASKS = tuple([(0x1F << (high - 6), high) for high in range(14, 5, -1)]
+                       + [(0x100F, 5)])
+# Short deck (6 and up) rules: the wheel is A-6-7-8-9, a nine high straight,
+# and a flush beats a full house. Short deck scores swap the Flush and Full
+# House categories so that plain score comparisons follow these rules;
+# SHORT_CATEGORIES maps categories to hand_rankings indices and back.
+SHORT_VALUES = tuple(range(6, 15))
+SHORT_STRAIGHT_MASKS = tuple([(0x1F << (high - 6), high)
+                              for high in range(14, 9, -1)] + [(0x10F0, 9)])
+FULL_CATEGORIES = tuple(range(10))
+SHORT_CATEGORIES = (0, 1, 2, 3, 4, 6, 5, 7, 8, 9)
+
+
+# Returns the high card of the best straight in a 13-bit value mask, or 0
+def find_straight(value_mask, straight_masks=STRAIGHT_MASKS):
+    for straight_mask, high in straight_masks:
+        if value_mask & straight_mask == straight_mask:
+            return high
+    return 0
+
+
+# Packs a hand category and its ordered card values into a single score
+def encode(category, values):
+    score = category
+    for index in range(5):
+        score <<= 4
+        if index < len(values):
+            score |= values[index]
+    return score
+
+
+# Returns the hand category of a score as an index into
+# holdem_functions.hand_rankings
+def hand_type(score, short_deck=False):
+    if short_deck:
+        return SHORT_CATEGORIES[score >> HAND_SHIFT]
+    return score >> HAND_SHIFT
+
+
+# Vectorized hand_type for an array of scores
+def hand_type_array(scores, short_deck=False):
+    if short_deck:
+        return np.array(SHORT_CATEGORIES)[scores >> HAND_SHIFT]
+    return scores >> HAND_SHIFT
+
+
+# Scores a hand without a flush from its value histogram
+# counts: list of (value, frequency) pairs sorted by descending value
+def score_counts(counts, short_deck=False):
+    categories = SHORT_CATEGORIES if short_deck else FULL_CATEGORIES
+    straight_masks = SHORT_STRAIGHT_MASKS if short_deck else STRAIGHT_MASKS
+    value_mask = 0
+    quads, trips, pairs, singles = [], [], [], []
+    for value, frequency in counts:
+        value_mask |= RANK_BITS[value]
+        if frequency == 4:
+            quads.append(value)
+        elif frequency == 3:
+            trips.append(value)
+        elif frequency == 2:
+            pairs.append(value)
+        else:
+            singles.append(value)
+    if quads:
+        kicker = max([value for value, _ in counts if value != quads[0]])
+        return encode(categories[7], (quads[0], kicker))
+    if trips and (len(trips) > 1 or pairs):
+        pair = max(trips[1:] + pairs)
+        return encode(categories[6], (trips[0], pair))
+    straight_high = find_straight(value_mask, straight_masks)
+    if straight_high:
+        return encode(4, (straight_high,))
+    if trips:
+        return encode(3, [trips[0]] + singles[:2])
+    if len(pairs) >= 2:
+        kicker = max(pairs[2:] + singles)
+        return encode(2, (pairs[0], pairs[1], kicker))
+    if pairs:
+        return encode(1, [pairs[0]] + singles[:3])
+    return encode(0, singles[:5])
+
+
+# Scores the flush formed by a 13-bit value mask of one suit.
+# Returns 0 if the mask holds fewer than five cards.
+def score_flush(value_mask, short_deck=False):
+    values = [value for value in range(14, 1, -1) if value_mask & RANK_BITS[value]]
+    if len(values) < 5:
+        return 0
+    straight_high = find_straight(
+        value_mask, SHORT_STRAIGHT_MASKS if short_deck else STRAIGHT_MASKS)
+    if straight_high == 14:
+        return encode(9, ())
+    if straight_high:
+        return encode(8, (straight_high,))
+    return encode(SHORT_CATEGORIES[5] if short_deck else 5, values[:5])
+
+
+# Returns the value histogram of a sorted sequence of card values as a list
+# of (value, frequency) pairs, or None if a value appears more than 4 times
+def count_values(values):
+    counts = [(value, len(list(group)))
+              for value, group in itertools.groupby(values)]
+    if max([frequency for _, frequency in counts]) > 4:
+        return None
+    return counts
+
+
+# Builds the lookup tables:
+# 1) flush_table: best flush or straight flush score for every suit mask,
+#    0 where the suit holds fewer than five cards
+# 2) rank_table: best non-flush score keyed by the sum of RANK_KEYS
+# short_deck: build the tables of short deck hands and rules instead
+def build_tables(short_deck=False):
+    deck_values = SHORT_VALUES if short_deck else tuple(range(2, 15))
+    flush_table = [score_flush(value_mask, short_deck)
+                   for value_mask in range(1 << 13)]
+    rank_table = {}
+    for values in itertools.combinations_with_replacement(deck_values[::-1],
+                                                          5):
+        counts = count_values(values)
+        if counts:
+            key = sum([RANK_KEYS[value] * frequency
+                       for value, frequency in counts])
+            rank_table[key] = score_counts(counts, short_deck)
+    # The best five of n cards is the best five of one of the n - 1 card
+    # subsets, so 6 and 7 card hands extend the smaller hands by one card
+    previous = rank_table
+    for _ in range(2):
+        current = {}
+        for key, score in previous.items():
+            for value in deck_values:
+                if (key >> (3 * (value - 2))) & 7 < 4:
+                    new_key = key + RANK_KEYS[value]
+                    if current.get(new_key, -1) < score:
+                        current[new_key] = score
+        previous = current
+        rank_table.update(current)
+    return flush_table, rank_table
+
+
+flush_table, rank_table = build_tables()
+# Histogram key of every 13-bit block of a card mask
+spread_table = [sum([RANK_KEYS[value] for value in range(2, 15)
+                     if value_mask & RANK_BITS[value]])
+                for value_mask in range(1 << 13)]
+# NumPy copies of the tables for scoring many hands at once. The histogram
+# keys are sorted so that they can be looked up with np.searchsorted.
+flush_array = np.array(flush_table, dtype=np.int64)
+spread_array = np.array(spread_table, dtype=np.int64)
+rank_keys = np.array(sorted(rank_table), dtype=np.int64)
+rank_scores = np.array([rank_table[key] for key in rank_keys.tolist()],
+                       dtype=np.int64)
+# Short deck (flush_array, rank_keys, rank_scores), built on first use
+short_deck_arrays = None
+
+
+# Returns the (flush_array, rank_keys, rank_scores) lookup arrays of a deck
+def lookup_arrays(short_deck=False):
+    global short_deck_arrays
+    if not short_deck:
+        return flush_array, rank_keys, rank_scores
+    if short_deck_arrays is None:
+        short_flush_table, short_rank_table = build_tables(short_deck=True)
+        short_keys = np.array(sorted(short_rank_table), dtype=np.int64)
+        short_deck_arrays = (
+            np.array(short_flush_table, dtype=np.int64), short_keys,
+            np.array([short_rank_table[key] for key in short_keys.tolist()],
+                     dtype=np.int64))
+    return short_deck_arrays
+
+
+# Returns the histogram key of a card mask
+def mask_key(mask):
+    return (spread_table[mask & SUIT_MASK] +
+            spread_table[(mask >> 13) & SUIT_MASK] +
+            spread_table[(mask >> 26) & SUIT_MASK] +
+            spread_table[mask >> 39])
+
+
+# Returns the score of a 5, 6 or 7 card hand given as a card mask
+def evaluate_mask(mask):
+    for shift in SUIT_SHIFTS:
+        score = flush_table[(mask >> shift) & SUIT_MASK]
+        if score:
+            return score
+    return rank_table[mask_key(mask)]
+
+
+# Takes the shared board mask and returns the data reused by every player:
+# (histogram key, bit offset of the only suit that can still form a flush
+#  or -1, value mask of that suit). A flush needs at least three suited cards
+# on the board, and at most one suit can have three cards on a board of five.
+def preprocess_board_mask(board_mask):
+    flush_shift, flush_mask = -1, 0
+    for shift in SUIT_SHIFTS:
+        suit_mask = (board_mask >> shift) & SUIT_MASK
+        if suit_mask.bit_count() >= 3:
+            flush_shift, flush_mask = shift, suit_mask
+    return mask_key(board_mask), flush_shift, flush_mask
+
+
+# Returns the score of a player's hole cards combined with a preprocessed
+# board. The hole cards' mask and histogram key don't change between boards,
+# so callers compute them once.
+def evaluate_hole_mask(hole_mask, hole_key, board_key, flush_shift,
+                       flush_mask):
+    if flush_shift >= 0:
+        score = flush_table[flush_mask |
+                            ((hole_mask >> flush_shift) & SUIT_MASK)]
+        if score:
+            return score
+    return rank_table[board_key + hole_key]
+
+
+# Returns the masks of an array of card codes, reducing over the last axis
+def codes_to_mask_array(codes):
+    return np.bitwise_or.reduce(
+        np.left_shift(1, np.asarray(codes, dtype=np.int64)), axis=-1)
+
+
+# Vectorized evaluate_mask: scores an array of 5, 6 or 7 card masks
+# short_deck: score short deck hands by short deck rules
+def evaluate_mask_array(masks, short_deck=False):
+    deck_flush_array, deck_rank_keys, deck_rank_scores = \
+        lookup_arrays(short_deck)
+    masks = np.asarray(masks, dtype=np.int64)
+    suit_masks = [(masks >> shift) & SUIT_MASK for shift in SUIT_SHIFTS]
+    keys = (spread_array[suit_masks[0]] + spread_array[suit_masks[1]] +
+            spread_array[suit_masks[2]] + spread_array[suit_masks[3]])
+    scores = deck_rank_scores[np.searchsorted(deck_rank_keys, keys)]
+    # With at most 7 cards a flush excludes four of a kind and full house, so
+    # the best of the two scores wins
+    for suit_mask in suit_masks:
+        scores = np.maximum(scores, deck_flush_array[suit_mask])
+    return scores
+
+
+# Returns the score of the best five cards among any 5 to 7 card codes by
+# trying every 5 card subset. Slow; used to cross-check the lookup tables.
+def evaluate_exhaustive(codes):
+    return max([evaluate_mask(sum([1 << code for code in combination]))
+                for combination in itertools.combinations(codes, 5)])
@@ -1,3 +1,5 @@
+from server.src.engine import holdem_evaluator
+
 # Constants
 suit_index_dict = {"s": 0, "c": 1, "h": 2, "d": 3}
 reverse_suit_index = ("s", "c", "h", "d")
@@ -8,6 +10,11 @@ hand_rankings = ("High Card", "Pair", "Two Pair", "Three of a Kind",
 suit_value_dict = {"T": 10, "J": 11, "Q": 12, "K": 13, "A": 14}
 for num in range(2, 10):
     suit_value_dict[str(num)] = num
+# Integer card encoding: a card is the code suit_index * 13 + value - 2 (0-51)
+# and a set of cards is a 64-bit mask with the bit of every card's code set
+full_deck_mask = (1 << 52) - 1
+# Cards of a short deck (6 and up): values 6-14 of every suit
+short_deck_mask = sum([((1 << 9) - 1) << (4 + 13 * suit) for suit in range(4)])
 
 class Card:
     # Takes in strings of the format: "As", "Tc", "6d"
@@ -15,6 +22,7 @@ class Card:
         value, self.suit = card_string[0], card_string[1]
         self.value = suit_value_dict[value]
         self.suit_index = suit_index_dict[self.suit]
+        self.code = self.suit_index * 13 + self.value - 2
 
     def __str__(self):
         return val_string[14 - self.value] + self.suit
@@ -29,216 +37,306 @@ class Card:
             return False
         return self.value == other.value and self.suit == other.suit
 
+
+# Weighted range of hole cards, e.g. "QQ+, AKs, ATs-A8s:0.5, AhKd". Items are
+# separated by commas:
+# 1) "QQ", "AKs", "AKo", "AK": a pair, suited, offsuit or any two cards
+# 2) "QQ+", "ATs+": the hand and every pair above it, or every kicker above
+#    it up to the card below the top card
+# 3) "QQ-99", "ATs-A8s": every hand between the two
+# 4) "AhKd": a single combination
+# An item followed by ":weight" is picked weight times as often as an item
+# without one. Later items override the weight of earlier ones.
+class HandRange:
+    def __init__(self, range_string):
+        self.range_string = range_string
+        weights = {}
+        for item in range_string.split(","):
+            item, _, weight = item.strip().partition(":")
+            for combination in parse_range_item(item):
+                weights[combination] = float(weight) if weight else 1.0
+        if not weights:
+            raise ValueError("Empty hand range: " + range_string)
+        # Each combination as a sorted pair of card codes
+        self.combinations = tuple(weights)
+        self.weights = tuple([weights[combination]
+                              for combination in self.combinations])
+
+    def __str__(self):
+        return self.range_string
+
+    def __repr__(self):
+        return self.range_string
+
+
+# Returns the sorted pairs of card codes of every combination of a hand class:
+# pair of value1 if suited is None and value1 == value2, otherwise suited,
+# offsuit or (if suited is None) both
+def class_combinations(value1, value2, suited):
+    combinations = []
+    for suit1 in range(4):
+        for suit2 in range(4):
+            if value1 == value2 and suit1 >= suit2:
+                continue
+            if value1 != value2 and suited is not None and \
+                    (suit1 == suit2) != suited:
+                continue
+            combinations.append(tuple(sorted((suit1 * 13 + value1 - 2,
+                                              suit2 * 13 + value2 - 2))))
+    return combinations
+
+
+# Returns the combinations of one item of a HandRange
+def parse_range_item(item):
+    if len(item) == 4 and item[1] in suit_index_dict:
+        return [tuple(sorted((card_to_code(item[:2]),
+                              card_to_code(item[2:]))))]
+    plus = item.endswith("+")
+    first, _, last = item.rstrip("+").partition("-")
+    value1, value2 = sorted([suit_value_dict[first[0]],
+                             suit_value_dict[first[1]]], reverse=True)
+    suited = {"s": True, "o": False}.get(first[2:])
+    if value1 == value2:
+        if plus:
+            last_value = 14
+        elif last:
+            last_value = suit_value_dict[last[0]]
+        else:
+            last_value = value1
+        low, high = sorted((value1, last_value))
+        return [combination for value in range(low, high + 1)
+                for combination in class_combinations(value, value, None)]
+    # Kickers run up to the card below the top card with "+"
+    if plus:
+        last_value = value1 - 1
+    elif last:
+        if suit_value_dict[last[0]] != value1:
+            raise ValueError("Invalid hand range item: " + item)
+        last_value = suit_value_dict[last[1]]
+    else:
+        last_value = value2
+    low, high = sorted((value2, last_value))
+    return [combination for value in range(low, high + 1)
+            for combination in class_combinations(value1, value, suited)]
+
+
+# Whether hole cards are drawn at random: unknown (None, None) or a HandRange
+def is_random_hand(hole_card):
+    return hole_card == (None, None) or isinstance(hole_card, HandRange)
+
+
+# Whether a card argument is a hand range rather than a card or "?"
+def is_range_string(card):
+    return (isinstance(card, str) and card != "?" and
+            not (len(card) == 2 and card[1] in suit_index_dict))
+
+
+# Returns the integer code of a Card, a card string ("As") or a code
+def card_to_code(card):
+    if isinstance(card, int):
+        return card
+    if isinstance(card, str):
+        return suit_index_dict[card[1]] * 13 + suit_value_dict[card[0]] - 2
+    return card.code
+
+
+# Returns the card string of an integer code, e.g. 51 -> "Ad"
+def code_to_string(code):
+    return val_string[12 - code % 13] + reverse_suit_index[code // 13]
+
+
+# Returns the mask of a sequence of cards in any supported representation
+def cards_to_mask(cards):
+    mask = 0
+    for card in cards:
+        mask |= 1 << card_to_code(card)
+    return mask
+
+
+# Returns the sorted list of card codes held in a mask
+def mask_to_codes(mask):
+    return [code for code in range(52) if mask >> code & 1]
+
+
+# Converts hole cards to integer codes, keeping unknown hole cards and hand
+# ranges unchanged
+def encode_hole_cards(hole_cards):
+    return tuple([hole_card if is_random_hand(hole_card) else
+                  (card_to_code(hole_card[0]), card_to_code(hole_card[1]))
+                  for hole_card in hole_cards])
+
+
+# Converts a board to a list of integer codes
+def encode_board(board):
+    if board is None:
+        return None
+    return [card_to_code(card) for card in board]
+
+
 # Returns deck of cards with all hole cards and board cards removed
-def generate_deck(hole_cards, board):
-    deck = []
-    for suit in reverse_suit_index:
-        for value in val_string:
-            deck.append(Card(value + suit))
-    taken_cards = []
+# The deck holds integer codes if the given cards are codes, Card objects
+# otherwise
+# short_deck: start from the 36 cards of a short deck
+def generate_deck(hole_cards, board, short_deck=False):
+    taken_mask, codes = 0, False
     for hole_card in hole_cards:
+        if isinstance(hole_card, HandRange):
+            continue
         for card in hole_card:
             if card is not None:
-                taken_cards.append(card)
+                taken_mask |= 1 << card_to_code(card)
+                codes = isinstance(card, int)
     if board and len(board) > 0:
-        taken_cards.extend(board)
-    for taken_card in taken_cards:
-        deck.remove(taken_card)
-    return tuple(deck)
+        taken_mask |= cards_to_mask(board)
+        codes = isinstance(board[0], int)
+    deck = mask_to_codes((short_deck_mask if short_deck else full_deck_mask) &
+                         ~taken_mask)
+    if codes:
+        return tuple(deck)
+    return tuple([Card(code_to_string(code)) for code in deck])
 
 # Generate all possible hole card combinations
 def generate_hole_cards(deck):
     import itertools
     return itertools.combinations(deck, 2)
 
+# Returns a np.random.SeedSequence for a seed given as None (fresh entropy),
+# an int, a SeedSequence or a np.random.Generator. A Generator is advanced, so
+# repeated calls with the same Generator give independent streams.
+def seed_sequence(seed):
+    import numpy as np
+    if isinstance(seed, np.random.SeedSequence):
+        return seed
+    if isinstance(seed, np.random.Generator):
+        return np.random.SeedSequence(int(seed.integers(1 << 63)))
+    return np.random.SeedSequence(seed)
+
+
 # Generate num_iterations random boards
-def generate_random_boards(deck, num_iterations, board_length):
+# The deck may also be given as a card mask
+# seed: anything accepted by seed_sequence
+def generate_random_boards(deck, num_iterations, board_length, seed=None):
     import random
-    import time
-    random.seed(time.time())
+    if isinstance(deck, int):
+        deck = mask_to_codes(deck)
+    rng = random.Random(int(seed_sequence(seed).generate_state(1)[0]))
     for _ in range(int(num_iterations)):
-        yield random.sample(deck, 5 - board_length)
+        yield rng.sample(deck, 5 - board_length)
 
 # Generate all possible boards
 def generate_exhaustive_boards(deck, num_iterations, board_length):
     import itertools
     return itertools.combinations(deck, 5 - board_length)
 
-# Returns a board of cards all with suit = flush_index
-def generate_suit_board(flat_board, flush_index):
-    histogram = [card.value for card in flat_board
-                 if card.suit_index == flush_index]
-    histogram.sort(reverse=True)
-    return histogram
-
-# Returns a list of two tuples of the form: (value of card, frequency of card)
-def preprocess(histogram):
-    return [(14 - index, frequency) for index, frequency in
-            enumerate(histogram) if frequency]
-
-
-# Takes an iterable sequence and returns two items in a tuple:
-# 1: 4-long list showing how often each card suit appears in the sequence
-# 2: 13-long list showing how often each card value appears in the sequence
-def preprocess_board(flat_board):
-    suit_histogram, histogram = [0] * 4, [0] * 13
-    # Reversing the order in histogram so in the future, we can traverse
-    # starting from index 0
-    for card in flat_board:
-        histogram[14 - card.value] += 1
-        suit_histogram[card.suit_index] += 1
-    return suit_histogram, histogram, max(suit_histogram)
-
-# Returns tuple: (Is there a straight flush?, high card)
-def detect_straight_flush(suit_board):
-    contiguous_length, fail_index = 1, len(suit_board) - 5
-    # Won't overflow list because we fail fast and check ahead
-    for index, elem in enumerate(suit_board):
-        current_val, next_val = elem, suit_board[index + 1]
-        if next_val == current_val - 1:
-            contiguous_length += 1
-            if contiguous_length == 5:
-                return True, current_val + 3
-        else:
-            # Fail fast if straight not possible
-            if index >= fail_index:
-                if (index == fail_index and next_val == 5 and
-                        suit_board[0] == 14):
-                    return True, 5
-                break
-            contiguous_length = 1
-    return False,
-
-# Returns the highest kicker available
-def detect_highest_quad_kicker(histogram_board):
-    for elem in histogram_board:
-        if elem[1] < 4:
-            return elem[0]
-
-# Returns tuple: (Is there a straight?, high card)
-def detect_straight(histogram_board):
-    contiguous_length, fail_index = 1, len(histogram_board) - 5
-    # Won't overflow list because we fail fast and check ahead
-    for index, elem in enumerate(histogram_board):
-        current_val, next_val = elem[0], histogram_board[index + 1][0]
-        if next_val == current_val - 1:
-            contiguous_length += 1
-            if contiguous_length == 5:
-                return True, current_val + 3
-        else:
-            # Fail fast if straight not possible
-            if index >= fail_index:
-                if (index == fail_index and next_val == 5 and
-                        histogram_board[0][0] == 14):
-                    return True, 5
-                break
-            contiguous_length = 1
-    return False,
-
-# Returns tuple of the two highest kickers that result from the three of a kind
-def detect_three_of_a_kind_kickers(histogram_board):
-    kicker1 = -1
-    for elem in histogram_board:
-        if elem[1] != 3:
-            if kicker1 == -1:
-                kicker1 = elem[0]
-            else:
-                return kicker1, elem[0]
-
-# Returns the highest kicker available
-def detect_highest_kicker(histogram_board):
-    for elem in histogram_board:
-        if elem[1] == 1:
-            return elem[0]
-
-# Returns tuple: (kicker1, kicker2, kicker3)
-def detect_pair_kickers(histogram_board):
-    kicker1, kicker2 = -1, -1
-    for elem in histogram_board:
-        if elem[1] != 2:
-            if kicker1 == -1:
-                kicker1 = elem[0]
-            elif kicker2 == -1:
-                kicker2 = elem[0]
-            else:
-                return kicker1, kicker2, elem[0]
-
-# Returns a list of the five highest cards in the given board
-# Note: Requires a sorted board to be given as an argument
-def get_high_cards(histogram_board):
-    return histogram_board[:5]
-
-# Return Values:
-# Royal Flush: (9,)
-# Straight Flush: (8, high card)
-# Four of a Kind: (7, quad card, kicker)
-# Full House: (6, trips card, pair card)
-# Flush: (5, [flush high card, flush second high card, ..., flush low card])
-# Straight: (4, high card)
-# Three of a Kind: (3, trips card, (kicker high card, kicker low card))
-# Two Pair: (2, high pair card, low pair card, kicker)
-# Pair: (1, pair card, (kicker high card, kicker med card, kicker low card))
-# High Card: (0, [high card, second high card, third high card, etc.])
-def detect_hand(hole_cards, given_board, suit_histogram,
-                full_histogram, max_suit):
-    # Determine if flush possible. If yes, four of a kind and full house are
-    # impossible, so return royal, straight, or regular flush.
-    if max_suit >= 3:
-        flush_index = suit_histogram.index(max_suit)
-        for hole_card in hole_cards:
-            if hole_card.suit_index == flush_index:
-                max_suit += 1
-        if max_suit >= 5:
-            flat_board = list(given_board)
-            flat_board.extend(hole_cards)
-            suit_board = generate_suit_board(flat_board, flush_index)
-            result = detect_straight_flush(suit_board)
-            if result[0]:
-                return (8, result[1]) if result[1] != 14 else (9,)
-            return 5, get_high_cards(suit_board)
-
-    # Add hole cards to histogram data structure and process it
-    full_histogram = full_histogram[:]
-    for hole_card in hole_cards:
-        full_histogram[14 - hole_card.value] += 1
-    histogram_board = preprocess(full_histogram)
-
-    # Find which card value shows up the most and second most times
-    current_max, max_val, second_max, second_max_val = 0, 0, 0, 0
-    for item in histogram_board:
-        val, frequency = item[0], item[1]
-        if frequency > current_max:
-            second_max, second_max_val = current_max, max_val
-            current_max, max_val = frequency, val
-        elif frequency > second_max:
-            second_max, second_max_val = frequency, val
-
-    # Check to see if there is a four of a kind
-    if current_max == 4:
-        return 7, max_val, detect_highest_quad_kicker(histogram_board)
-    # Check to see if there is a full house
-    if current_max == 3 and second_max >= 2:
-        return 6, max_val, second_max_val
-    # Check to see if there is a straight
-    if len(histogram_board) >= 5:
-        result = detect_straight(histogram_board)
-        if result[0]:
-            return 4, result[1]
-    # Check to see if there is a three of a kind
-    if current_max == 3:
-        return 3, max_val, detect_three_of_a_kind_kickers(histogram_board)
-    if current_max == 2:
-        # Check to see if there is a two pair
-        if second_max == 2:
-            return 2, max_val, second_max_val, detect_highest_kicker(
-                histogram_board)
-        # Return pair
+
+# Generate num_iterations random boards in batches, each batch an array of
+# shape (at most batch_size, 5 - board_length) holding card codes
+# seed: anything accepted by np.random.default_rng, e.g. a SeedSequence
+def generate_random_board_batches(deck, num_iterations, board_length,
+                                  batch_size, seed=None):
+    return generate_random_card_batches(deck, num_iterations,
+                                        5 - board_length, batch_size, seed)
+
+
+# Generate num_iterations random draws of num_cards distinct cards from the
+# deck in batches of shape (at most batch_size, num_cards). The cards of a draw
+# are in random order, so a draw can be split into hole cards and a board.
+def generate_random_card_batches(deck, num_iterations, num_cards, batch_size,
+                                 seed=None):
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    deck = np.array(deck, dtype=np.int64)
+    remaining = int(num_iterations)
+    while remaining > 0:
+        num_boards = min(batch_size, remaining)
+        if num_cards:
+            # The positions of the num_cards smallest random keys in each row
+            # are a uniform sample without replacement
+            keys = rng.random((num_boards, len(deck)))
+            indices = np.argpartition(keys, num_cards - 1,
+                                      axis=1)[:, :num_cards]
+            # argpartition leaves them in no particular order; sorting by key
+            # shuffles them
+            order = np.argsort(np.take_along_axis(keys, indices, axis=1),
+                               axis=1)
+            indices = np.take_along_axis(indices, order, axis=1)
         else:
-            return 1, max_val, detect_pair_kickers(histogram_board)
-    # Check for high cards
-    return 0, get_high_cards(histogram_board)
+            indices = np.zeros((num_boards, 0), dtype=np.int64)
+        yield deck[indices]
+        remaining -= num_boards
+
+
+# Generate all possible boards in batches of at most batch_size boards
+# start, stop: only generate the boards with these combination indices
+def generate_exhaustive_board_batches(deck, num_iterations, board_length,
+                                      batch_size, start=0, stop=None):
+    import itertools
+    import numpy as np
+    num_cards = 5 - board_length
+    if num_cards == 0:
+        if start == 0 and stop != 0:
+            yield np.zeros((1, 0), dtype=np.int64)
+        return
+    boards = itertools.islice(itertools.combinations(deck, num_cards), start,
+                              stop)
+    while True:
+        batch = np.fromiter(itertools.chain.from_iterable(
+            itertools.islice(boards, batch_size)), dtype=np.int64)
+        if len(batch) == 0:
+            return
+        yield batch.reshape(-1, num_cards)
+
+# Returns the mask of a card set after relabelling its suits: the cards of
+# suit i are moved to suit permutation[i]
+def permute_mask(mask, permutation):
+    permuted = 0
+    for suit_index, shift in enumerate(holdem_evaluator.SUIT_SHIFTS):
+        permuted |= (((mask >> shift) & holdem_evaluator.SUIT_MASK) <<
+                     holdem_evaluator.SUIT_SHIFTS[permutation[suit_index]])
+    return permuted
+
+
+# Vectorized permute_mask for an array of masks
+def permute_mask_array(masks, permutation):
+    permuted = 0
+    for suit_index, shift in enumerate(holdem_evaluator.SUIT_SHIFTS):
+        permuted = permuted | (((masks >> shift) & holdem_evaluator.SUIT_MASK)
+                               << holdem_evaluator.SUIT_SHIFTS[
+                                   permutation[suit_index]])
+    return permuted
+
+
+# Returns the suit permutations that map every known hand and the given board
+# onto itself. Two boards related by one of them give every player the same
+# result, so only one board of each such class has to be evaluated.
+def suit_symmetries(hole_cards, given_board):
+    import itertools
+    masks = [cards_to_mask(hole_card) for hole_card in hole_cards
+             if not is_random_hand(hole_card)]
+    if given_board:
+        masks.append(cards_to_mask(given_board))
+    return [permutation for permutation in itertools.permutations(range(4))
+            if all([permute_mask(mask, permutation) == mask
+                    for mask in masks])]
+
+
+# Takes an array of board masks and the suit symmetries of the hand and
+# returns (is_canonical, weights):
+# 1) is_canonical: whether each board is the smallest mask of its class
+# 2) weights: number of distinct boards in each board's class
+def canonical_board_weights(board_masks, symmetries):
+    import numpy as np
+    is_canonical = np.ones(len(board_masks), dtype=bool)
+    stabilizer_sizes = np.zeros(len(board_masks), dtype=np.int64)
+    for permutation in symmetries:
+        permuted = permute_mask_array(board_masks, permutation)
+        is_canonical &= board_masks <= permuted
+        stabilizer_sizes += permuted == board_masks
+    return is_canonical, len(symmetries) // stabilizer_sizes
+
 
 # Returns the index of the player with the winning hand
+# result_list holds one holdem_evaluator score (a plain integer) per player
 def compare_hands(result_list):
     best_hand = max(result_list)
     winning_player_index = result_list.index(best_hand) + 1
@@ -255,6 +353,11 @@ def print_results(hole_cards, winner_list, result_histograms):
         winning_percentage = float(winner_list[index + 1]) / float_iterations
         if hole_card == (None, None):
             print("(?, ?) : ", winning_percentage)
+        elif isinstance(hole_card, HandRange):
+            print("[" + str(hole_card) + "] : ", winning_percentage)
+        elif isinstance(hole_card[0], int):
+            print("(" + ", ".join(map(code_to_string, hole_card)) + ")", ": ",
+                  winning_percentage)
         else:
             print(hole_card, ": ", winning_percentage)
     print("Ties: ", float(winner_list[0]) / float_iterations, "\n")
@@ -274,27 +377,213 @@ def find_winning_percentage(winner_list):
     return percentages
 
 # Populate provided data structures with results from simulation
+# All cards are integer codes (see encode_hole_cards and encode_board)
 def find_winner(generate_boards, deck, hole_cards, num, board_length,
                 given_board, winner_list, result_histograms):
+    # The hole cards and the given part of the board are fixed, so their
+    # masks and histogram keys are computed once
+    given_mask = cards_to_mask(given_board) if given_board else 0
+    hole_masks = [cards_to_mask(hole_card) for hole_card in hole_cards]
+    hole_keys = [holdem_evaluator.mask_key(mask) for mask in hole_masks]
     # Run simulations
     result_list = [None] * len(hole_cards)
     for remaining_board in generate_boards(deck, num, board_length):
         # Generate a new board
-        if given_board:
-            board = given_board[:]
-            board.extend(remaining_board)
-        else:
-            board = remaining_board
+        board_mask = given_mask
+        for card in remaining_board:
+            board_mask |= 1 << card
         # Find the best possible poker hand given the created board and the
         # hole cards and save them in the results data structures
-        suit_histogram, histogram, max_suit = (
-            preprocess_board(board))
-        for index, hole_card in enumerate(hole_cards):
-            result_list[index] = detect_hand(hole_card, board, suit_histogram,
-                                             histogram, max_suit)
+        board_key, flush_shift, flush_mask = (
+            holdem_evaluator.preprocess_board_mask(board_mask))
+        for index, hole_mask in enumerate(hole_masks):
+            result_list[index] = holdem_evaluator.evaluate_hole_mask(
+                hole_mask, hole_keys[index], board_key, flush_shift,
+                flush_mask)
         # Find the winner of the hand and tabulate results
         winner_index = compare_hands(result_list)
         winner_list[winner_index] += 1
         # Increment what hand each player made
         for index, result in enumerate(result_list):
-            result_histograms[index][result[0]] += 1
+            result_histograms[index][result >> holdem_evaluator.HAND_SHIFT] += 1
+
+
+# Batch version of find_winner: scores whole batches of boards with NumPy
+# and tabulates them with np.bincount
+# generate_board_batches: generate_random_board_batches or
+# generate_exhaustive_board_batches
+# isomorphic: only score one board of every class of boards related by a suit
+# symmetry of the hand (see suit_symmetries), counting it once for every board
+# in its class. Only valid with generate_exhaustive_board_batches.
+# short_deck: rank hands by short deck rules; pass a short deck from
+# generate_deck
+def find_winner_batch(generate_board_batches, deck, hole_cards, num,
+                      board_length, given_board, winner_list,
+                      result_histograms, batch_size=10000, isomorphic=False,
+                      short_deck=False):
+    import numpy as np
+    num_players, num_hands = len(hole_cards), len(hand_rankings)
+    given_mask = cards_to_mask(given_board) if given_board else 0
+    hole_masks = np.array([cards_to_mask(hole_card)
+                           for hole_card in hole_cards], dtype=np.int64)
+    symmetries = suit_symmetries(hole_cards, given_board) if isomorphic else []
+    weights = None
+    for boards in generate_board_batches(deck, num, board_length, batch_size):
+        board_masks = given_mask | holdem_evaluator.codes_to_mask_array(boards)
+        if len(symmetries) > 1:
+            is_canonical, weights = canonical_board_weights(board_masks,
+                                                            symmetries)
+            board_masks, weights = (board_masks[is_canonical],
+                                    weights[is_canonical])
+        # scores[i, j]: score of player j on board i
+        scores = holdem_evaluator.evaluate_mask_array(
+            board_masks[:, np.newaxis] | hole_masks, short_deck)
+        tally_scores(scores, winner_list, result_histograms, weights,
+                     short_deck)
+
+
+# Adds a batch of scores (scores[i, j]: score of player j in simulation i) to
+# winner_list and result_histograms, counting simulation i weights[i] times
+def tally_scores(scores, winner_list, result_histograms, weights=None,
+                 short_deck=False):
+    import numpy as np
+    num_players, num_hands = scores.shape[1], len(hand_rankings)
+    # Find the winner of each board, 0 for ties, and tabulate results
+    is_best = scores == scores.max(axis=1, keepdims=True)
+    winners = np.where(is_best.sum(axis=1) == 1,
+                       is_best.argmax(axis=1) + 1, 0)
+    # Weighted counts come back as floats
+    winner_counts = np.bincount(winners, weights,
+                                minlength=num_players + 1).astype(np.int64)
+    for index, count in enumerate(winner_counts.tolist()):
+        winner_list[index] += count
+    # Count what hand each player made
+    hand_types = (holdem_evaluator.hand_type_array(scores, short_deck) +
+                  num_hands * np.arange(num_players))
+    hand_weights = None
+    if weights is not None:
+        hand_weights = np.repeat(weights, num_players)
+    hand_counts = np.bincount(hand_types.ravel(), hand_weights,
+                              minlength=num_players * num_hands
+                              ).astype(np.int64)
+    for index, histogram in enumerate(
+            hand_counts.reshape(num_players, num_hands).tolist()):
+        for hand_index, count in enumerate(histogram):
+            result_histograms[index][hand_index] += count
+
+
+# Monte Carlo simulation for hole cards that include random hands (see
+# is_random_hand). Every simulation draws the hands of HandRange players from
+# their weighted combinations, then the unknown hands and the rest of the
+# board uniformly from the remaining cards, so one pass of num simulations
+# covers every possible holding.
+# seed: anything accepted by np.random.default_rng
+def find_winner_random_hands(deck, hole_cards, num, board_length, given_board,
+                             winner_list, result_histograms, batch_size=10000,
+                             seed=None):
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    num_players = len(hole_cards)
+    given_mask = cards_to_mask(given_board) if given_board else 0
+    # Cards held by known players or on the board
+    dead_mask = full_deck_mask & ~cards_to_mask(deck)
+    known_masks = np.array([0 if is_random_hand(hole_card) else
+                            cards_to_mask(hole_card)
+                            for hole_card in hole_cards], dtype=np.int64)
+    # Combination masks and cumulative probabilities of every range that
+    # avoid the dead cards
+    ranges = []
+    for index, hole_card in enumerate(hole_cards):
+        if isinstance(hole_card, HandRange):
+            masks = np.array([cards_to_mask(combination)
+                              for combination in hole_card.combinations],
+                             dtype=np.int64)
+            weights = np.array(hole_card.weights)
+            weights[(masks & dead_mask) != 0] = 0
+            if weights.sum() == 0:
+                raise ValueError("No hand in range " + str(hole_card) +
+                                 " is possible")
+            ranges.append((index, masks, np.cumsum(weights / weights.sum())))
+    range_indices = [index for index, _, _ in ranges]
+    unknown_indices = [index for index, hole_card in enumerate(hole_cards)
+                       if hole_card == (None, None)]
+    num_board_cards = 5 - board_length
+    num_cards = num_board_cards + 2 * len(unknown_indices)
+    card_bits = np.left_shift(1, np.arange(52, dtype=np.int64))
+    remaining = int(num)
+    while remaining > 0:
+        num_simulations = min(batch_size, remaining)
+        hole_masks = np.tile(known_masks, (num_simulations, 1))
+        # Draw every range hand, drawing again in the simulations where two
+        # range hands share a card
+        rows, num_draws = np.arange(num_simulations), 0
+        while len(rows):
+            num_draws += 1
+            if num_draws > 1000:
+                raise ValueError("The hand ranges can't be dealt together")
+            for index, masks, probabilities in ranges:
+                choices = np.searchsorted(probabilities,
+                                          rng.random(len(rows)), side='right')
+                hole_masks[rows, index] = masks[np.minimum(choices,
+                                                           len(masks) - 1)]
+            range_masks = hole_masks[rows][:, range_indices]
+            overlapping = (range_masks.sum(axis=1) !=
+                           np.bitwise_or.reduce(range_masks, axis=1))
+            rows = rows[overlapping]
+        taken_masks = dead_mask | np.bitwise_or.reduce(hole_masks, axis=1)
+        # The num_cards smallest random keys among the cards that are left,
+        # in random order
+        keys = rng.random((num_simulations, 52))
+        keys[(taken_masks[:, np.newaxis] & card_bits) != 0] = 2
+        cards = np.argpartition(keys, num_cards - 1, axis=1)[:, :num_cards] \
+            if num_cards else np.zeros((num_simulations, 0), dtype=np.int64)
+        order = np.argsort(np.take_along_axis(keys, cards, axis=1), axis=1)
+        cards = np.take_along_axis(cards, order, axis=1)
+        board_masks = given_mask | holdem_evaluator.codes_to_mask_array(
+            cards[:, :num_board_cards])
+        for position, index in enumerate(unknown_indices):
+            start = num_board_cards + 2 * position
+            hole_masks[:, index] = holdem_evaluator.codes_to_mask_array(
+                cards[:, start:start + 2])
+        scores = holdem_evaluator.evaluate_mask_array(
+            board_masks[:, np.newaxis] | hole_masks)
+        tally_scores(scores, winner_list, result_histograms)
+        remaining -= num_simulations
+
+
+# Returns the (low, high) normal approximation confidence interval of every
+# percentage in winner_list
+def confidence_intervals(winner_list, confidence=0.95):
+    import math
+    import statistics
+    num_iterations = sum(winner_list)
+    z = statistics.NormalDist().inv_cdf((1 + confidence) / 2)
+    intervals = []
+    for num_wins in winner_list:
+        percentage = num_wins / num_iterations
+        half_width = z * math.sqrt(percentage * (1 - percentage) /
+                                   num_iterations)
+        intervals.append((max(0.0, percentage - half_width),
+                          min(1.0, percentage + half_width)))
+    return intervals
+
+
+# Adaptive Monte Carlo: calls simulate_batch(num) to add num more simulations
+# to winner_list until every percentage is known to within target_error at the
+# given confidence, time_budget seconds have passed or max_iterations
+# simulations have run. Returns the confidence intervals reached.
+def find_winner_adaptive(simulate_batch, winner_list, target_error,
+                         time_budget, confidence, max_iterations, batch_size):
+    import time
+    start = time.time()
+    num_iterations = sum(winner_list)
+    while num_iterations < max_iterations:
+        simulate_batch(min(batch_size, max_iterations - num_iterations))
+        num_iterations = sum(winner_list)
+        intervals = confidence_intervals(winner_list, confidence)
+        error = max([(high - low) / 2 for low, high in intervals])
+        if error <= target_error:
+            break
+        if time_budget is not None and time.time() - start >= time_budget:
+            break
+    return confidence_intervals(winner_list, confidence)
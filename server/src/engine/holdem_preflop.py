@@ -0,0 +1,314 @@
+import argparse
+import functools
+import itertools
+import json
+import os
+import time
+
+import numpy as np
+
+from server.src.engine import holdem_evaluator
+from server.src.engine import holdem_functions
+
+# Precomputed pre-flop equities. The tables are built once by running this
+# module (see main) and memory-mapped when the module is imported:
+# 1) vs_random_table[hand_class, num_players - 2]: (win, tie) probability of a
+#    starting hand class against num_players - 1 random hands, 2-9 players.
+#    As in calculate, a tie is any board on which the best hand is shared,
+#    also between opponents only, and a win is a board the hand wins alone.
+# 2) heads_up_keys, heads_up_table: (win, tie) probability of the first hand
+#    of every heads-up matchup that is distinct under suit relabelling, keyed
+#    by matchup_key and sorted by key for np.searchsorted
+# 3) table_iterations: the Monte Carlo boards per entry of vs_random_table and
+#    heads_up_table. Queries asking for more boards aren't answered from them.
+data_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              "data")
+vs_random_file = "preflop_vs_random.npy"
+heads_up_keys_file = "preflop_heads_up_keys.npy"
+heads_up_file = "preflop_heads_up.npy"
+iterations_file = "preflop_iterations.npy"
+max_players = 9
+# Starting hand classes form a 13x13 grid indexed by row * 13 + column, rows
+# and columns ordered from ace to deuce: pairs on the diagonal, offsuit hands
+# above it (row < column) and suited hands below it
+grid_values = "AKQJT98765432"
+suit_permutations = tuple(itertools.permutations(range(4)))
+
+
+# Returns the starting hand class (0-168) of two card codes
+def hand_class(hole_cards):
+    row, column = [12 - code % 13 for code in hole_cards]
+    high, low = min(row, column), max(row, column)
+    if hole_cards[0] // 13 == hole_cards[1] // 13:
+        return low * 13 + high
+    return high * 13 + low
+
+
+# Returns the name of a starting hand class, e.g. "AKs", "T9o" or "77"
+def class_name(index):
+    row, column = divmod(index, 13)
+    if row == column:
+        return grid_values[row] * 2
+    if row < column:
+        return grid_values[row] + grid_values[column] + "o"
+    return grid_values[column] + grid_values[row] + "s"
+
+
+# Returns the card codes of one hand of a starting hand class
+def class_hole_cards(index):
+    row, column = divmod(index, 13)
+    # Suited hands are both spades, other hands a spade and a club
+    second_suit = 0 if row > column else 1
+    return 12 - row, second_suit * 13 + 12 - column
+
+
+# Returns the index (0-2703) of two card codes in either order
+def hand_index(hole_cards):
+    low, high = sorted(hole_cards)
+    return low * 52 + high
+
+
+# Returns the card codes of hole_cards with their suits relabelled
+def permute_hole_cards(hole_cards, permutation):
+    return tuple(sorted([permutation[code // 13] * 13 + code % 13
+                         for code in hole_cards]))
+
+
+# Returns (key, swapped) for a heads-up matchup of two hands of card codes:
+# 1) key: the same for every matchup that differs only by suit relabelling
+#    or the order of the hands
+# 2) swapped: whether the hands are in the opposite order in the key
+def matchup_key(hole_cards1, hole_cards2):
+    candidates = []
+    for permutation in suit_permutations:
+        index1 = hand_index(permute_hole_cards(hole_cards1, permutation))
+        index2 = hand_index(permute_hole_cards(hole_cards2, permutation))
+        candidates.extend([(index1, index2, False), (index2, index1, True)])
+    index1, index2, swapped = min(candidates)
+    return index1 * 2704 + index2, swapped
+
+
+# Returns the heads-up matchups that are distinct under suit relabelling and
+# hand order, as a sorted list of (key, hole_cards1, hole_cards2). Every
+# matchup's first hand is the smallest hand of its class, and the second hand
+# is the smallest under the suit relabellings that keep the first hand fixed.
+def canonical_matchups():
+    hands = list(itertools.combinations(range(52), 2))
+    matchups = {}
+    for hole_cards1 in hands:
+        if hole_cards1 != min([permute_hole_cards(hole_cards1, permutation)
+                               for permutation in suit_permutations]):
+            continue
+        stabilizer = [permutation for permutation in suit_permutations
+                      if permute_hole_cards(hole_cards1, permutation) ==
+                      hole_cards1]
+        for hole_cards2 in hands:
+            if set(hole_cards1) & set(hole_cards2):
+                continue
+            if hole_cards2 != min([permute_hole_cards(hole_cards2,
+                                                      permutation)
+                                   for permutation in stabilizer]):
+                continue
+            key, swapped = matchup_key(hole_cards1, hole_cards2)
+            if not swapped:
+                matchups[key] = (hole_cards1, hole_cards2)
+    return [(key,) + matchups[key] for key in sorted(matchups)]
+
+
+# Monte Carlo (win, tie) probability of hole cards against num_opponents
+# random hands, with the win and tie of find_winner_random_hands. Opponent
+# hands and the board are drawn together.
+def simulate_vs_random(hole_cards, num_opponents, num_iterations, seed=None,
+                       batch_size=10000):
+    deck = holdem_functions.generate_deck((hole_cards,), None)
+    hole_mask = holdem_functions.cards_to_mask(hole_cards)
+    wins, ties = 0, 0
+    for cards in holdem_functions.generate_random_card_batches(
+            deck, num_iterations, 5 + 2 * num_opponents, batch_size, seed):
+        board_masks = holdem_evaluator.codes_to_mask_array(cards[:, :5])
+        scores = holdem_evaluator.evaluate_mask_array(board_masks | hole_mask)
+        opponent_masks = holdem_evaluator.codes_to_mask_array(
+            cards[:, 5:].reshape(len(cards), num_opponents, 2))
+        opponent_scores = holdem_evaluator.evaluate_mask_array(
+            board_masks[:, np.newaxis] | opponent_masks)
+        best_scores = np.maximum(scores, opponent_scores.max(axis=1))
+        num_best = ((scores == best_scores) +
+                    (opponent_scores == best_scores[:, np.newaxis]).sum(axis=1))
+        wins += int(((scores == best_scores) & (num_best == 1)).sum())
+        ties += int((num_best > 1).sum())
+    return wins / num_iterations, ties / num_iterations
+
+
+# Builds vs_random_table with num_iterations boards per entry
+def build_vs_random_table(num_iterations, seed=None):
+    seeds = iter(np.random.SeedSequence(seed).spawn(169 * (max_players - 1)))
+    table = np.zeros((169, max_players - 1, 2))
+    for index in range(169):
+        for num_players in range(2, max_players + 1):
+            table[index, num_players - 2] = simulate_vs_random(
+                class_hole_cards(index), num_players - 1, num_iterations,
+                next(seeds))
+    return table
+
+
+# Builds heads_up_keys and heads_up_table with num_iterations boards per
+# matchup
+def build_heads_up_table(num_iterations, seed=None):
+    matchups = canonical_matchups()
+    seeds = np.random.SeedSequence(seed).spawn(len(matchups))
+    keys = np.array([key for key, _, _ in matchups], dtype=np.int32)
+    table = np.zeros((len(matchups), 2))
+    for index, (_, hole_cards1, hole_cards2) in enumerate(matchups):
+        hole_cards = (hole_cards1, hole_cards2)
+        winner_list = [0, 0, 0]
+        result_histograms = [[0] * len(holdem_functions.hand_rankings)
+                             for _ in range(2)]
+        holdem_functions.find_winner_batch(
+            functools.partial(holdem_functions.generate_random_board_batches,
+                              seed=seeds[index]),
+            holdem_functions.generate_deck(hole_cards, None), hole_cards,
+            num_iterations, 0, None, winner_list, result_histograms)
+        table[index] = (winner_list[1] / num_iterations,
+                        winner_list[0] / num_iterations)
+    return keys, table
+
+
+# Writes the tables to directory as .npy files
+def save_tables(vs_random_table, heads_up_keys, heads_up_table,
+                table_iterations, directory=data_directory):
+    os.makedirs(directory, exist_ok=True)
+    np.save(os.path.join(directory, vs_random_file), vs_random_table)
+    np.save(os.path.join(directory, heads_up_keys_file), heads_up_keys)
+    np.save(os.path.join(directory, heads_up_file), heads_up_table)
+    np.save(os.path.join(directory, iterations_file),
+            np.array(table_iterations, dtype=np.int64))
+
+
+# Memory-maps the tables in directory. Returns None for every table if they
+# haven't been built.
+def load_tables(directory=data_directory):
+    file_names = (vs_random_file, heads_up_keys_file, heads_up_file,
+                  iterations_file)
+    paths = [os.path.join(directory, file_name) for file_name in file_names]
+    if not all([os.path.exists(path) for path in paths]):
+        return None, None, None, None
+    return tuple([np.load(path, mmap_mode='r') for path in paths])
+
+
+vs_random_table, heads_up_keys, heads_up_table, table_iterations = \
+    load_tables()
+
+
+# Returns the heads-up (win, tie) probability of the first of two hands
+def heads_up_equity(hole_cards1, hole_cards2):
+    key, swapped = matchup_key(hole_cards1, hole_cards2)
+    index = int(np.searchsorted(heads_up_keys, key))
+    win, tie = [float(value) for value in heads_up_table[index]]
+    if swapped:
+        return 1 - win - tie, tie
+    return win, tie
+
+
+# Answers a pre-flop query given as the hole_cards argument of
+# holdem_calc.calculate ("?" for unknown cards) from the tables. Returns the
+# same [tie, player1, player2, ...] percentages as calculate, or None if the
+# tables haven't been built or don't cover the query: only two known hands,
+# or one known hand against up to eight unknown hands, are covered, and only
+# if the table was built with at least num boards per entry.
+def lookup(hole_cards, num=None):
+    if vs_random_table is None or len(hole_cards) % 2 or \
+            any(map(holdem_functions.is_range_string, hole_cards)):
+        return None
+    hands = []
+    for index in range(0, len(hole_cards), 2):
+        if hole_cards[index] == "?" and hole_cards[index + 1] == "?":
+            hands.append(None)
+        elif "?" in hole_cards[index:index + 2]:
+            return None
+        else:
+            hands.append(tuple([holdem_functions.card_to_code(card)
+                                for card in hole_cards[index:index + 2]]))
+    known = [index for index, hand in enumerate(hands) if hand is not None]
+    codes = [code for index in known for code in hands[index]]
+    # Invalid queries are left to the calculators to report
+    if not 2 <= len(hands) <= max_players or len(set(codes)) != len(codes):
+        return None
+    if len(known) == 2 == len(hands):
+        if num is not None and num > table_iterations[1]:
+            return None
+        win, tie = heads_up_equity(hands[0], hands[1])
+        return [tie, win, 1 - win - tie]
+    if len(known) != 1 or num is not None and num > table_iterations[0]:
+        return None
+    hero = known[0]
+    win, tie = [float(value) for value in
+                vs_random_table[hand_class(hands[hero]), len(hands) - 2]]
+    # Random hands are interchangeable, so they share the boards won by a
+    # single opponent equally
+    result = [tie] + [(1 - win - tie) / (len(hands) - 1)] * len(hands)
+    result[hero + 1] = win
+    return result
+
+
+# Writes HeatMapData.py: every starting hand class with its equity against
+# one random hand (ties count half). The symbol of a class (suitedness and
+# hand ranking) is kept from file_name if it exists; new files rank the
+# classes by equity.
+def write_heatmap(file_name, table=None):
+    if table is None:
+        table = vs_random_table
+    equities = [float(table[index, 0, 0] + table[index, 0, 1] / 2)
+                for index in range(169)]
+    ranks = [0] * 169
+    for rank, index in enumerate(sorted(range(169),
+                                        key=lambda i: -equities[i])):
+        ranks[index] = rank
+    symbols = {}
+    if os.path.exists(file_name):
+        with open(file_name) as input_file:
+            _, data = input_file.read().split("=", 1)
+        symbols = {(entry["x"], entry["y"]): entry["symbol"]
+                   for entry in json.loads(data)}
+    heatmap_data = []
+    for index in range(169):
+        row, column = divmod(index, 13)
+        suffix = "" if row == column else "o" if row < column else "s"
+        cell = (grid_values[row], grid_values[column])
+        heatmap_data.append({"x": cell[0], "y": cell[1],
+                             "heat": round(equities[index], 2),
+                             "symbol": symbols.get(
+                                 cell, suffix + "\n " + str(ranks[index]))})
+    with open(file_name, 'w') as output_file:
+        output_file.write("heatmap_data = " +
+                          json.dumps(heatmap_data, indent=4) + "\n")
+
+
+# Build step: python -m server.src.engine.holdem_preflop
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build the pre-flop equity tables used by the engine.")
+    parser.add_argument("-n", type=int, default=100000,
+                        help="Monte Carlo simulations per starting hand and "
+                             "number of players")
+    parser.add_argument("--heads-up-n", type=int, default=50000,
+                        help="Monte Carlo simulations per heads-up matchup "
+                             "(47008 matchups)")
+    parser.add_argument("-o", "--output", type=str, default=data_directory,
+                        help="Directory to write the tables to")
+    parser.add_argument("--heatmap", type=str,
+                        help="Also refresh the heat values of this "
+                             "HeatMapData.py file")
+    parser.add_argument("--seed", type=int, help="Seed of the simulations")
+    args = parser.parse_args()
+    vs_random = build_vs_random_table(args.n, args.seed)
+    heads_up_keys, heads_up = build_heads_up_table(args.heads_up_n, args.seed)
+    save_tables(vs_random, heads_up_keys, heads_up,
+                (args.n, args.heads_up_n), args.output)
+    if args.heatmap:
+        write_heatmap(args.heatmap, vs_random)
+
+
+if __name__ == '__main__':
+    start = time.time()
+    main()
+    print("\nTime elapsed(seconds): ", time.time() - start)
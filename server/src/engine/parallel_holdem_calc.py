@@ -1,189 +1,329 @@
+import atexit
+import functools
+import math
 import multiprocessing
+import os
 import time
+from multiprocessing import resource_tracker
+
+import numpy as np
+
 from server.src.engine import holdem_argparser
+from server.src.engine import holdem_evaluator
 from server.src.engine import holdem_functions
 
 
+# Worker pool reused by every simulation. It is created on first use, so
+# repeated equity queries only pay for the computation, and closed by
+# shutdown_pool or when the interpreter exits.
+worker_pool = None
+# False if the pool was handed in through set_pool and is owned by the caller
+owns_worker_pool = False
+
+
 def main():
     hole_cards, num, exact, board, file_name = holdem_argparser.parse_args()
     run(hole_cards, num, exact, board, file_name, True)
 
 
-def calculate(board, exact, num, input_file, hole_cards, verbose):
+# seed: seed of the Monte Carlo simulations, see holdem_calc.calculate. Every
+# worker gets an independent stream spawned from it, so results reproduce on
+# machines with the same number of CPUs.
+def calculate(board, exact, num, input_file, hole_cards, verbose, seed=None):
     args = holdem_argparser.LibArgs(board, exact, num, input_file, hole_cards)
     hole_cards, n, e, board, filename = holdem_argparser.parse_lib_args(args)
-    return run(hole_cards, n, e, board, filename, verbose)
+    return run(hole_cards, n, e, board, filename, verbose, seed)
+
+
+# Typed library entry point with the arguments of calculate, so it can stand
+# in for it (e.g. in holdem_cache). Cards are integer codes or objects with a
+# code attribute, like holdem_functions.Card or the game's Cards, and "?" or
+# None for unknown hole cards. They skip the string parsing and checks of
+# holdem_argparser, which stays for the command line; only duplicate and out
+# of range cards are rejected, with a ValueError. Input files and hand ranges
+# go through calculate. Unlike calculate, exact queries may have more than one
+# unknown hand: as in run_simulation, their unknown hands and boards are then
+# drawn at random num times.
+def calculate_cards(board, exact, num, input_file, hole_cards, verbose,
+                    seed=None):
+    if input_file:
+        raise ValueError("Input files are only supported by calculate")
+    codes = [None if card is None or card == "?" else
+             holdem_functions.card_to_code(card) for card in hole_cards]
+    board = [holdem_functions.card_to_code(card) for card in board or []]
+    known = [code for code in codes if code is not None] + board
+    if len(codes) % 2 or len(codes) < 4:
+        raise ValueError("Hole cards must be given in pairs for at least "
+                         "two players")
+    if len(board) not in (0, 3, 4, 5):
+        raise ValueError("Board must have a length of 3, 4, or 5")
+    if any(not 0 <= code < 52 for code in known) or \
+            len(set(known)) != len(known):
+        raise ValueError("The cards given must be valid and unique")
+    hole_cards = tuple(zip(codes[::2], codes[1::2]))
+    if any(None in hand and hand != (None, None) for hand in hole_cards):
+        raise ValueError("Unknown hole cards must come in pairs")
+    board = board or None
+    deck = holdem_functions.generate_deck(hole_cards, board)
+    return run_simulation(hole_cards, int(num), exact, board,
+                          tuple(map(holdem_functions.card_to_code, deck)),
+                          verbose, seed)
 
 
-def run(hole_cards, num, exact, board, file_name, verbose):
+# Adaptive Monte Carlo version of calculate, see holdem_calc.calculate_adaptive.
+# Every batch is split between the worker processes.
+def calculate_adaptive(board, hole_cards, target_error=0.005, time_budget=None,
+                       confidence=0.95, verbose=False, batch_size=40000,
+                       max_iterations=10000000, seed=None):
+    args = holdem_argparser.LibArgs(board, False, max_iterations, None,
+                                    hole_cards)
+    hole_cards, _, _, board, _ = holdem_argparser.parse_lib_args(args)
+    hole_cards = holdem_functions.encode_hole_cards(hole_cards)
+    board = holdem_functions.encode_board(board)
+    deck = holdem_functions.generate_deck(hole_cards, board)
+    board_length = 0 if board is None else len(board)
+    winner_list, result_histograms = empty_tally(len(hole_cards))
+    # Every batch spawns its worker streams from the next seed of rng
+    rng = np.random.default_rng(seed)
+
+    def simulate_batch(num):
+        if any(map(holdem_functions.is_random_hand, hole_cards)):
+            find_winner_random_hands(deck, hole_cards, num, board_length,
+                                     board, winner_list, result_histograms,
+                                     rng)
+        else:
+            find_winner(holdem_functions.generate_random_board_batches, deck,
+                        hole_cards, num, board_length, board, winner_list,
+                        result_histograms, rng)
+
+    intervals = holdem_functions.find_winner_adaptive(
+        simulate_batch, winner_list, target_error, time_budget, confidence,
+        max_iterations, batch_size)
+    if verbose:
+        holdem_functions.print_results(hole_cards, winner_list,
+                                       result_histograms)
+        print("Confidence intervals: ", intervals)
+    return holdem_functions.find_winning_percentage(winner_list), intervals
+
+
+def run(hole_cards, num, exact, board, file_name, verbose, seed=None):
     if file_name:
+        # One generator for the whole file, so every line gets its own streams
+        rng = np.random.default_rng(seed)
         input_file = open(file_name, 'r')
         for line in input_file:
             if line is not None and len(line.strip()) == 0:
                 continue
-            hole_cards, board = holdem_argparser.parse_file_args(line)
+            hole_cards, board = holdem_argparser.parse_file_args(line, exact)
             deck = holdem_functions.generate_deck(hole_cards, board)
-            run_simulation(hole_cards, num, exact, board, deck, verbose)
+            run_simulation(hole_cards, num, exact, board, deck, verbose, rng)
             print("-----------------------------------")
         input_file.close()
     else:
         deck = holdem_functions.generate_deck(hole_cards, board)
-        return run_simulation(hole_cards, num, exact, board, deck, verbose)
+        return run_simulation(hole_cards, num, exact, board, deck, verbose,
+                              seed)
 
 
-def run_simulation(hole_cards, num, exact, given_board, deck, verbose):
+def run_simulation(hole_cards, num, exact, given_board, deck, verbose,
+                   seed=None):
+    # Simulate on integer card codes rather than Card objects
+    hole_cards = holdem_functions.encode_hole_cards(hole_cards)
+    given_board = holdem_functions.encode_board(given_board)
+    deck = tuple([holdem_functions.card_to_code(card) for card in deck])
     num_players = len(hole_cards)
     # Choose whether we're running a Monte Carlo or exhaustive simulation
     board_length = 0 if given_board is None else len(given_board)
-    # Create data structures to manage multiple processes:
-    # 1) winner_list: number of times each player wins a hand
-    # 2) result_histograms: a list for each player that shows the number of
+    # Create results data structures which track results of comparisons
+    # 1) result_histograms: a list for each player that shows the number of
     #    times each type of poker hand (e.g. flush, straight) was gotten
-    num_processes = multiprocessing.cpu_count()
-    num_poker_hands = len(holdem_functions.hand_rankings)
-    num_histograms = num_processes * num_players * num_poker_hands
-    winner_list = multiprocessing.Array('i', num_processes * (num_players + 1))
-    result_histograms = multiprocessing.Array('i', num_histograms)
-    # When a board is given, exact calculation is much faster than Monte Carlo
-    # simulation, so default to exact if a board is given
+    # 2) winner_list: number of times each player wins the given round
+    # Every worker returns its own tally, which is added to these at the end
+    result_histograms, winner_list = [], [0] * (num_players + 1)
+    for _ in range(num_players):
+        result_histograms.append([0] * len(holdem_functions.hand_rankings))
     if exact:
-        generate_boards = holdem_functions.generate_exhaustive_boards
+        generate_boards = holdem_functions.generate_exhaustive_board_batches
     else:
-        generate_boards = holdem_functions.generate_random_boards
-    if (None, None) in hole_cards:
-        hole_cards_list = list(hole_cards)
+        generate_boards = holdem_functions.generate_random_board_batches
+    random_hands = list(filter(holdem_functions.is_random_hand, hole_cards))
+    if random_hands and not (exact and random_hands == [(None, None)]):
+        # Unknown hands and hand ranges are drawn together with the board
+        find_winner_random_hands(deck, hole_cards, num, board_length,
+                                 given_board, winner_list, result_histograms,
+                                 seed)
+    elif (None, None) in hole_cards:
+        # Enumerate every holding of the only unknown player
         unknown_index = hole_cards.index((None, None))
-        deck_list = list(deck)
-        pool = multiprocessing.Pool(processes=num_processes,
-                                    initializer=unknown_simulation_init,
-                                    initargs=(hole_cards_list, unknown_index,
-                                              deck_list, generate_boards,
-                                              num, board_length, given_board,
-                                              winner_list, result_histograms))
-        pool.map(unknown_simulation, holdem_functions.generate_hole_cards(deck))
+        find_winner_unknown(generate_boards, deck, hole_cards, unknown_index,
+                            num, board_length, given_board, winner_list,
+                            result_histograms)
     else:
         find_winner(generate_boards, deck, hole_cards, num, board_length,
-                    given_board, winner_list, result_histograms)
-    # Go through each parallel data structure and aggregate results
-    combined_winner_list, combined_histograms = [0] * (num_players + 1), []
-    for _ in range(num_players):
-        combined_histograms.append([0] * len(holdem_functions.hand_rankings))
-    for index, element in enumerate(winner_list):
-        combined_winner_list[index % (num_players + 1)] += element
-    for index, element in enumerate(result_histograms):
-        combined_histograms[int((index / num_poker_hands) % num_players)][
-            (index % num_poker_hands)] += element
+                    given_board, winner_list, result_histograms, seed)
     if verbose:
-        holdem_functions.print_results(hole_cards, combined_winner_list,
-                                       combined_histograms)
-    return holdem_functions.find_winning_percentage(combined_winner_list)
-
-
-def unknown_simulation_init(hole_cards_list, unknown_index, deck_list,
-                            generate_boards, num, board_length, given_board,
-                            combined_winner_list, combined_result_histograms):
-    unknown_simulation.hole_cards_list = hole_cards_list
-    unknown_simulation.unknown_index = unknown_index
-    unknown_simulation.deck = deck_list
-    unknown_simulation.generate_boards = generate_boards
-    unknown_simulation.num = num
-    unknown_simulation.board_length = board_length
-    unknown_simulation.given_board = given_board
-    unknown_simulation.combined_winner_list = combined_winner_list
-    unknown_simulation.combined_result_histograms = combined_result_histograms
-
-
-def unknown_simulation(new_hole_cards):
-    # Extract parameters
-    hole_cards_list = unknown_simulation.hole_cards_list
-    unknown_index = unknown_simulation.unknown_index
-    deck = unknown_simulation.deck[:]
-    generate_boards = unknown_simulation.generate_boards
-    num = unknown_simulation.num
-    board_length = unknown_simulation.board_length
-    given_board = unknown_simulation.given_board
-    combined_winner_list = unknown_simulation.combined_winner_list
-    combined_result_histograms = unknown_simulation.combined_result_histograms
-    # Set simulation variables
-    num_players = len(hole_cards_list)
-    result_histograms, winner_list = [], [0] * (num_players + 1)
-    for _ in range(num_players):
-        result_histograms.append([0] * len(holdem_functions.hand_rankings))
-    hole_cards_list[unknown_index] = new_hole_cards
-    deck.remove(new_hole_cards[0])
-    deck.remove(new_hole_cards[1])
-    # Find winner
-    holdem_functions.find_winner(generate_boards, deck, tuple(hole_cards_list),
-                                 num, board_length, given_board, winner_list,
-                                 result_histograms)
-    # Write results to parallel data structure for future tabulation
-    proc_name = multiprocessing.current_process().name
-    proc_id = int(proc_name.split("-")[-1]) % multiprocessing.cpu_count()
-    for index, result in enumerate(winner_list):
-        combined_winner_list[proc_id * (num_players + 1) + index] += result
-    for histogram_index, histogram in enumerate(result_histograms):
-        for index, result in enumerate(histogram):
-            combined_result_histograms[len(holdem_functions.hand_rankings) *
-                                       (proc_id * num_players + histogram_index)
-                                       + index] += result
-
-
-# TODO Nutte sorgt für "Hello from the pygame community. https://www.pygame.org/contribute.html"
+        holdem_functions.print_results(hole_cards, winner_list,
+                                       result_histograms)
+    return holdem_functions.find_winning_percentage(winner_list)
+
+
+# Returns the worker pool, creating one process per CPU on first use. The
+# resource tracker is started first, so that the workers share it with this
+# process and shared memory attached by a worker stays owned by this process
+# (see table.attach_shared_memory).
+def get_pool():
+    global worker_pool, owns_worker_pool
+    if worker_pool is None:
+        if os.name == 'posix':
+            resource_tracker.ensure_running()
+        worker_pool = multiprocessing.Pool(
+            processes=multiprocessing.cpu_count())
+        owns_worker_pool = True
+    return worker_pool
+
+
+# Makes the engine use a pool owned by the caller. Anything with a
+# map(function, iterable) method works, e.g. a multiprocessing.Pool or a
+# concurrent.futures.ProcessPoolExecutor. Process pools used with shared
+# memory on Python < 3.13 should be created after
+# multiprocessing.resource_tracker.ensure_running(), as get_pool does.
+def set_pool(pool):
+    shutdown_pool()
+    global worker_pool, owns_worker_pool
+    worker_pool, owns_worker_pool = pool, False
+
+
+# Closes the worker pool if the engine created it; a pool passed to set_pool
+# is only released
+def shutdown_pool():
+    global worker_pool, owns_worker_pool
+    if worker_pool is not None and owns_worker_pool:
+        worker_pool.close()
+        worker_pool.join()
+    worker_pool, owns_worker_pool = None, False
+
+
+atexit.register(shutdown_pool)
+
+
+# Adds a worker's (winner_list, result_histograms) tally to the totals
+def add_tally(tally, winner_list, result_histograms):
+    chunk_winner_list, chunk_histograms = tally
+    for index, count in enumerate(chunk_winner_list):
+        winner_list[index] += count
+    for histogram, chunk_histogram in zip(result_histograms,
+                                          chunk_histograms):
+        for index, count in enumerate(chunk_histogram):
+            histogram[index] += count
+
+
+# Returns empty (winner_list, result_histograms) data structures
+def empty_tally(num_players):
+    return ([0] * (num_players + 1),
+            [[0] * len(holdem_functions.hand_rankings)
+             for _ in range(num_players)])
+
+
+# Splits the simulation into one chunk per process. Monte Carlo chunks get
+# their own seed and number of iterations, exact chunks a range of board
+# combination indices. Each worker generates and evaluates its boards locally
+# and sends back one small tally.
+# seed: anything accepted by holdem_functions.seed_sequence
 def find_winner(generate_boards, deck, hole_cards, num, board_length,
-                given_board, winner_list, result_histograms):
+                given_board, winner_list, result_histograms, seed=None):
     num_processes = multiprocessing.cpu_count()
-    # Create threadpool and use it to perform hand detection over all boards
-    pool = multiprocessing.Pool(processes=num_processes,
-                                initializer=simulation_init,
-                                initargs=(given_board, hole_cards, winner_list,
-                                          result_histograms))
-    pool.map(simulation, generate_boards(deck, num, board_length))
-
-
-# Initialize shared variables for simulation
-def simulation_init(given_board, hole_cards, winner_list, result_histograms):
-    simulation.given_board = given_board
-    simulation.hole_cards = hole_cards
-    simulation.winner_list = winner_list
-    simulation.result_histograms = result_histograms
-
-
-# Separated function for each thread to execute while running
-def simulation(remaining_board):
-    # Extract variables shared through inheritance
-    given_board, hole_cards = simulation.given_board, simulation.hole_cards
-    winner_list = simulation.winner_list
-    result_histograms = simulation.result_histograms
-    # Generate a new board
-    if given_board:
-        board = given_board[:]
-        board.extend(remaining_board)
+    if generate_boards is holdem_functions.generate_exhaustive_board_batches:
+        num_boards = math.comb(len(deck), 5 - board_length)
+        bounds = [num_boards * index // num_processes
+                  for index in range(num_processes + 1)]
+        chunks = [(bounds[index + 1] - bounds[index],
+                   {"start": bounds[index], "stop": bounds[index + 1]})
+                  for index in range(num_processes)]
     else:
-        board = remaining_board
-    num_players = len(hole_cards)
-    # Extract process id from the name of the current process
-    # Names are of the format: PoolWorker-1 - PoolWorker-n
-    proc_name = multiprocessing.current_process().name
-    proc_id = int(proc_name.split("-")[-1]) % multiprocessing.cpu_count()
-    # Create results data structure which tracks results of comparisons
-    result_list = []
-    for _ in range(num_players):
-        result_list.append([])
-    # Find the best possible poker hand given the created board and the
-    # hole cards and save them in the results data structures
-    suit_histogram, histogram, max_suit = (
-        holdem_functions.preprocess_board(board))
-    for index, hole_card in enumerate(hole_cards):
-        result_list[index] = (
-            holdem_functions.detect_hand(hole_card, board, suit_histogram,
-                                         histogram, max_suit))
-    # Find the winner of the hand and tabulate results
-    winner_index = holdem_functions.compare_hands(result_list)
-    winner_list[proc_id * (num_players + 1) + winner_index] += 1
-    # Increment what hand each player made
-    for index, result in enumerate(result_list):
-        result_histograms[len(holdem_functions.hand_rankings) *
-                          (proc_id * num_players + index) + result[0]] += 1
+        num = int(num)
+        seeds = holdem_functions.seed_sequence(seed).spawn(num_processes)
+        chunks = [(num * (index + 1) // num_processes -
+                   num * index // num_processes, {"seed": seeds[index]})
+                  for index in range(num_processes)]
+    tasks = [(generate_boards, deck, hole_cards, chunk_num, board_length,
+              given_board, chunk_args)
+             for chunk_num, chunk_args in chunks if chunk_num > 0]
+    for tally in get_pool().map(simulation, tasks):
+        add_tally(tally, winner_list, result_histograms)
+
+
+# Separated function for each process to execute while running: simulates
+# one chunk of boards and returns its tally
+def simulation(task):
+    (generate_boards, deck, hole_cards, num, board_length, given_board,
+     chunk_args) = task
+    winner_list, result_histograms = empty_tally(len(hole_cards))
+    # Exact chunks enumerate one board per class of suit-isomorphic boards
+    isomorphic = (generate_boards is
+                  holdem_functions.generate_exhaustive_board_batches)
+    holdem_functions.find_winner_batch(
+        functools.partial(generate_boards, **chunk_args), deck, hole_cards,
+        num, board_length, given_board, winner_list, result_histograms,
+        isomorphic=isomorphic)
+    return winner_list, result_histograms
+
+
+# Splits a simulation with random hands (see
+# holdem_functions.find_winner_random_hands) into one seeded chunk per process
+def find_winner_random_hands(deck, hole_cards, num, board_length, given_board,
+                             winner_list, result_histograms, seed=None):
+    num_processes, num = multiprocessing.cpu_count(), int(num)
+    seeds = holdem_functions.seed_sequence(seed).spawn(num_processes)
+    tasks = [(deck, hole_cards, num * (index + 1) // num_processes -
+              num * index // num_processes, board_length, given_board,
+              seeds[index]) for index in range(num_processes)]
+    for tally in get_pool().map(random_hands_simulation,
+                                [task for task in tasks if task[2] > 0]):
+        add_tally(tally, winner_list, result_histograms)
+
+
+# Simulates one chunk of random hands and returns its tally
+def random_hands_simulation(task):
+    deck, hole_cards, num, board_length, given_board, seed = task
+    winner_list, result_histograms = empty_tally(len(hole_cards))
+    holdem_functions.find_winner_random_hands(
+        deck, hole_cards, num, board_length, given_board, winner_list,
+        result_histograms, seed=seed)
+    return winner_list, result_histograms
+
+
+# Runs a full simulation for every possible pair of unknown hole cards,
+# splitting the pairs into one chunk per process
+def find_winner_unknown(generate_boards, deck, hole_cards, unknown_index, num,
+                        board_length, given_board, winner_list,
+                        result_histograms):
+    num_processes = multiprocessing.cpu_count()
+    filler_hole_cards = list(holdem_functions.generate_hole_cards(deck))
+    tasks = [(generate_boards, deck, hole_cards, unknown_index, num,
+              board_length, given_board, filler_hole_cards[index::num_processes])
+             for index in range(num_processes)]
+    for tally in get_pool().map(unknown_simulation, tasks):
+        add_tally(tally, winner_list, result_histograms)
+
+
+# Simulates one chunk of unknown hole cards and returns its tally
+def unknown_simulation(task):
+    (generate_boards, deck, hole_cards, unknown_index, num, board_length,
+     given_board, filler_chunk) = task
+    hole_cards_list = list(hole_cards)
+    winner_list, result_histograms = empty_tally(len(hole_cards))
+    isomorphic = (generate_boards is
+                  holdem_functions.generate_exhaustive_board_batches)
+    for new_hole_cards in filler_chunk:
+        hole_cards_list[unknown_index] = new_hole_cards
+        deck_list = list(deck)
+        deck_list.remove(new_hole_cards[0])
+        deck_list.remove(new_hole_cards[1])
+        holdem_functions.find_winner_batch(
+            generate_boards, tuple(deck_list), tuple(hole_cards_list), num,
+            board_length, given_board, winner_list, result_histograms,
+            isomorphic=isomorphic)
+    return winner_list, result_histograms
 
 
 if __name__ == '__main__':
@@ -6,6 +6,49 @@ import logging
 import numpy as np
 from collections import Counter
 
+from server.src.engine.utils import hand_type_dict, comb_index
+
+
+class RankingRules:
+    # Hand ranking rules of a deck type, precomputed for Ranker.rank_direct:
+    # straight_masks: (high card, value mask) of every straight from lowest to highest, the first being the wheel
+    # hand_ranks: rank of each hand type in the rank * 16 ** 5 + kickers values
+    def __init__(self, name, straight_masks, hand_ranks):
+        self.name = name
+        self.straight_masks = straight_masks
+        self.wheel_high = straight_masks[0][0]
+        self.hand_ranks = hand_ranks
+        self.hand_type_dict = {rank: hand_type for hand_type, rank in hand_ranks.items()}
+
+
+# Full deck: A2345 is the lowest straight
+full_rules = RankingRules(
+    "full", [(5, 0b111100 | (1 << 14))] + [(high, 0b11111 << (high - 4)) for high in range(6, 15)],
+    {hand_type: rank for rank, hand_type in hand_type_dict.items()})
+# Short deck (6 and up): A6789 is the lowest straight and a flush beats a full house
+short_rules = RankingRules(
+    "short", [(9, (0b1111 << 6) | (1 << 14))] + [(high, 0b11111 << (high - 4)) for high in range(10, 15)],
+    dict(full_rules.hand_ranks, **{'Flush': 6, 'Full House': 5}))
+ranking_rules = {"full": full_rules, "short": short_rules}
+
+# Omaha hands are ranked in chunks of this many hands, each expanded to 60 five card hands
+omaha_chunk_rows = 2000
+# Index tables of the Omaha five card hands keyed by the number of community cards
+omaha_index_registry = {}
+
+
+def omaha_index(num_community):
+    # Rows of 5 indices into 4 hole cards followed by num_community community cards: every pair of hole cards with
+    # every three community cards
+    if num_community not in omaha_index_registry:
+        hole_idx, community_idx = comb_index(4, 2), comb_index(num_community, 3) + 4
+        index = np.concatenate([np.repeat(hole_idx, len(community_idx), axis=0),
+                                np.tile(community_idx, (len(hole_idx), 1))], axis=1)
+        index.flags.writeable = False
+        omaha_index_registry[num_community] = index
+    return omaha_index_registry[num_community]
+
+
 class Ranker:
 
     @staticmethod
@@ -52,8 +95,114 @@ class Ranker:
         one_pair_check(num_combos, rank_arr)
         return rank_arr * (16 ** 5) + np.sum(num_combos * np.power(16, np.arange(0, 5)), axis=1)
 
+    @staticmethod
+    def rank_direct(hands, rules=full_rules):
+        # Ranks hands of 5 to 7 cards, shape (..., num_cards, 2), in a single pass instead of taking the max over
+        # every 5 card subset. Returns the same rank * 16 ** 5 + kickers values as rank_all_hands, ranked by rules.
+        lead_shape = hands.shape[:-2]
+        hands = hands.reshape(-1, hands.shape[-2], 2).astype(np.int64)
+        num_arr, suit_arr = hands[:, :, 0], hands[:, :, 1]
+        num_hands = len(hands)
+        row_offsets = np.arange(num_hands)[:, np.newaxis]
+
+        # Per-row histograms of card values (index 0-14) and suits
+        num_counts = np.bincount((num_arr + 15 * row_offsets).ravel(), minlength=15 * num_hands).reshape(-1, 15)
+        suit_counts = np.bincount((suit_arr + 4 * row_offsets).ravel(), minlength=4 * num_hands).reshape(-1, 4)
+        # Bit v of a value mask is set if a card of value v is present
+        num_mask = np.bitwise_or.reduce(np.left_shift(1, num_arr), axis=1)
+        flush_suit = np.argmax(suit_counts, axis=1)
+        flush_arr = suit_counts[np.arange(num_hands), flush_suit] >= 5
+        flush_mask = np.bitwise_or.reduce(
+            np.where(suit_arr == flush_suit[:, np.newaxis], np.left_shift(1, num_arr), 0), axis=1)
+
+        straight_high = gen_straight_high(num_mask, rules.straight_masks)
+        straight_flush_high = np.where(flush_arr, gen_straight_high(flush_mask, rules.straight_masks), 0)
+
+        # Values ordered by (count, value), so quads come first, then trips, pairs and single cards
+        group_keys = -np.sort(-(num_counts * 16 + np.arange(15)) * (num_counts > 0), axis=1)
+        group_nums, group_counts = group_keys[:, :3] % 16, group_keys[:, :3] // 16
+
+        one_pair = group_counts[:, 0] == 2
+        three_of_a_kind = group_counts[:, 0] == 3
+        # Each hand type: (hands that make it, values of their best five cards given the hands)
+        hand_checks = {
+            'One Pair': (one_pair, lambda hand: np.concatenate([
+                np.repeat(group_nums[hand, :1], 2, axis=1),
+                top_nums(clear_nums(num_mask[hand], group_nums[hand, 0]), 3)], axis=1)),
+            'Two Pairs': (one_pair & (group_counts[:, 1] == 2), lambda hand: np.concatenate([
+                np.repeat(group_nums[hand, :2], 2, axis=1),
+                top_nums(clear_nums(num_mask[hand], group_nums[hand, 0], group_nums[hand, 1]), 1)], axis=1)),
+            'Three of a Kind': (three_of_a_kind, lambda hand: np.concatenate([
+                np.repeat(group_nums[hand, :1], 3, axis=1),
+                top_nums(clear_nums(num_mask[hand], group_nums[hand, 0]), 2)], axis=1)),
+            'Straight': (straight_high > 0, lambda hand: straight_nums(straight_high[hand], rules.wheel_high)),
+            'Flush': (flush_arr, lambda hand: top_nums(flush_mask[hand], 5)),
+            'Full House': (three_of_a_kind & (group_counts[:, 1] >= 2), lambda hand: np.concatenate([
+                np.repeat(group_nums[hand, :1], 3, axis=1),
+                np.repeat(group_nums[hand, 1:2], 2, axis=1)], axis=1)),
+            'Four of a Kind': (group_counts[:, 0] == 4, lambda hand: np.concatenate([
+                np.repeat(group_nums[hand, :1], 4, axis=1),
+                top_nums(clear_nums(num_mask[hand], group_nums[hand, 0]), 1)], axis=1)),
+            'Straight Flush': (straight_flush_high > 0,
+                               lambda hand: straight_nums(straight_flush_high[hand], rules.wheel_high)),
+        }
+
+        # best_nums: values of the best five cards, most significant first. Stronger hand types are applied last
+        # so they overwrite the weaker ones a hand also makes.
+        rank_arr = np.zeros(num_hands, dtype=np.int64)
+        best_nums = top_nums(num_mask, 5)
+        for hand_type in sorted(hand_checks, key=rules.hand_ranks.get):
+            hand, gen_best_nums = hand_checks[hand_type]
+            rank_arr[hand] = rules.hand_ranks[hand_type]
+            best_nums[hand] = gen_best_nums(hand)
+
+        res_arr = rank_arr * (16 ** 5) + np.sum(best_nums * np.power(16, np.arange(4, -1, -1)), axis=1)
+        return res_arr.reshape(lead_shape)
+
+    @staticmethod
+    def rank_omaha(hands, rules=full_rules):
+        # Ranks Omaha hands, shape (..., 4 + num_community, 2) with the hole cards first, where the best hand uses
+        # exactly two hole cards and three community cards. Hands are expanded to their five card hands one chunk
+        # at a time to bound memory.
+        lead_shape = hands.shape[:-2]
+        hands = hands.reshape(-1, hands.shape[-2], 2)
+        hand_idx = omaha_index(hands.shape[1] - 4)
+        res_arr = np.zeros(len(hands), dtype=np.int64)
+        for start in range(0, len(hands), omaha_chunk_rows):
+            res_arr[start:start + omaha_chunk_rows] = Ranker.rank_direct(
+                hands[start:start + omaha_chunk_rows][:, hand_idx], rules).max(axis=1)
+        return res_arr.reshape(lead_shape)
+
 
 ### Helper Functions
+def gen_straight_high(num_mask, straight_masks=full_rules.straight_masks):
+    # High card of the best straight in each value mask, 0 if there is none. The wheel (A2345) is five high.
+    straight_high = np.zeros(len(num_mask), dtype=np.int64)
+    for high, straight_mask in straight_masks:
+        straight_high[(num_mask & straight_mask) == straight_mask] = high
+    return straight_high
+
+
+def straight_nums(straight_high, wheel_high=full_rules.wheel_high):
+    # Card values of straights, most significant first, in rank_all_hands order: the wheel is 5432A
+    nums = straight_high[:, np.newaxis] - np.arange(5)
+    nums[straight_high == wheel_high, 4] = 14
+    return nums
+
+
+def top_nums(num_mask, num_cards):
+    # The num_cards highest values in each value mask, highest first, padded with 0
+    present = (num_mask[:, np.newaxis] >> np.arange(14, 1, -1)) & 1
+    return -np.sort(-present * np.arange(14, 1, -1), axis=1)[:, :num_cards]
+
+
+def clear_nums(num_mask, *nums):
+    # Removes values from value masks
+    for num in nums:
+        num_mask = num_mask & ~np.left_shift(1, num)
+    return num_mask
+
+
 def gen_straight_arr(num_combos):
     straight_check = np.zeros(len(num_combos), dtype=int)
     for i in range(4):
@@ -129,7 +278,7 @@ def three_of_a_kind_check(num_combos, rank_arr):
     rank_arr[(rank_arr == 0) & (small | middle | large)] = 3
 
     reorder_small = (rank_arr == 3) & small
-    reorder_middle = (rank_arr == 3) & large
+    reorder_middle = (rank_arr == 3) & middle
 
     num_combos[reorder_small, :] = np.concatenate([num_combos[reorder_small, 3:], num_combos[reorder_small, :3]],
                                                   axis=1)
@@ -155,7 +304,7 @@ def two_pairs_check(num_combos, rank_arr):
     rank_arr[(rank_arr == 0) & (small | middle | large)] = 2
 
     reorder_small = (rank_arr == 2) & small
-    reorder_middle = (rank_arr == 2) & large
+    reorder_middle = (rank_arr == 2) & middle
 
     num_combos[reorder_small, :] = np.concatenate([num_combos[reorder_small, 4:], num_combos[reorder_small, :4]],
                                                   axis=1)
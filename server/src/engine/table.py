@@ -1,6 +1,8 @@
 import multiprocessing
+import sys
+from multiprocessing import shared_memory
 from joblib import Parallel, delayed
-import random
+from itertools import islice
 import timeit
 import logging
 
@@ -9,6 +11,10 @@ import numpy as np
 from server.src.engine.utils import *
 from server.src.engine.hand import Hand
 from server.src.engine.ranker import *
+from server.src.engine import parallel_holdem_calc
+
+# Parallel Engine simulations give each process a shard of at least this many scenarios
+min_shard_rows = 5000
 
 logger = logging.getLogger()
 logger.setLevel(logging.DEBUG)
@@ -16,50 +22,58 @@ logger.setLevel(logging.DEBUG)
 
 class Table:
 
-    def __init__(self, num_players, hand_limit, deck_type='full'):
+    # rules: name of the hand ranking rules in ranker.ranking_rules, the rules of the deck type by default
+    # seed: seed of the random cards and scenarios, anything accepted by np.random.default_rng
+    def __init__(self, num_players, hand_limit, deck_type='full', rules=None, seed=None):
 
-        self.deck_arr = self.generate_deck(deck_type)
-        self.player_hands = {player_num: Hand(hand_limit) for player_num in range(1, num_players + 1)}
+        self.deck = Deck(deck_type)
+        self.rng = np.random.default_rng(seed)
+        self.hand_limit = hand_limit
+        self.rules = ranking_rules[deck_type if rules is None else rules]
+        self.player_hands = {player_num: Hand(hand_limit, self.rules) for player_num in range(1, num_players + 1)}
         self.num_players = num_players
         self.community_arr = np.zeros(shape=(0, 2), dtype=int)
+        # Scenarios evaluated by the last simulate_incremental call, reused on later streets
+        self.scenario_cache = None
 
-    def generate_deck(self, deck_type):
-
-        if deck_type == "full":
-            num = ["2", "3", "4", "5", "6", "7", "8", "9", "T", "J", "Q", "K", "A"]
-        elif deck_type == "short":
-            num = ["6", "7", "8", "9", "T", "J", "Q", "K", "A"]
-        else:
-            raise DeckException("Invalid Deck Type. Valid options are: Full/Short ")
+    @property
+    def deck_arr(self):
+        return self.deck.card_arr
 
-        suit = ["d", "c", "s", "h"]
-        return card_str_to_arr([n + s for n in num for s in suit])
+    def generate_deck(self, deck_type):
+        return Deck(deck_type).card_arr
 
     def add_to_hand(self, player_num, cards):
 
         cards = format_cards(cards)
-        for card in cards:
-            self.player_hands[player_num].add_cards(card)
-            self.deck_arr = remove_card(card, self.deck_arr)
+        self.deck.remove(cards)
+        try:
+            self.player_hands[player_num].add_cards(cards)
+        except HandException:
+            self.deck.add(cards)
+            raise
 
     def add_to_community(self, cards):
         cards = format_cards(cards)
 
-        for card in cards:
-            self.community_arr = add_card(card, self.community_arr)
-            self.deck_arr = remove_card(card, self.deck_arr)
-
-    def simulation_preparation(self, num_scenarios):
+        self.deck.remove(cards)
+        self.community_arr = np.concatenate([self.community_arr, slot_cards[card_slots(cards)]], axis=0)
 
+    def check_starting_hands(self):
         for player in self.player_hands:
             if len(self.player_hands[player].card_arr) < self.player_hands[player].hand_limit:
                 raise HandException(f"Please Deal a Starting Hand to Player {player}")
 
+    def simulation_preparation(self, num_scenarios):
+
+        self.check_starting_hands()
+
         total_idx = comb_index(len(self.deck_arr), 5 - len(self.community_arr))
-        undrawn_combos = self.deck_arr[total_idx]
         if num_scenarios != 'all':
-            if len(undrawn_combos) > num_scenarios:
-                undrawn_combos = undrawn_combos[np.array(random.sample(range(len(undrawn_combos)), num_scenarios))]
+            if len(total_idx) > num_scenarios:
+                # Sample the cached index before gathering cards so only the sampled rows are copied
+                total_idx = total_idx[self.rng.choice(len(total_idx), num_scenarios, replace=False)]
+        undrawn_combos = self.deck_arr[total_idx]
 
         if len(self.community_arr) > 0:
             community_cards = np.repeat([self.community_arr], len(undrawn_combos), axis=0)
@@ -67,9 +81,75 @@ class Table:
             community_cards = None
         return community_cards, undrawn_combos
 
+    def undrawn_combo_chunks(self, num_scenarios, chunk_size):
+        # Streaming version of simulation_preparation: yields the undrawn cards of the scenarios in chunks of at
+        # most chunk_size rows without building the index of every combination. Random scenarios are drawn
+        # independently, so a combination can come up more than once.
+        num_cards = 5 - len(self.community_arr)
+        if num_cards == 0:
+            yield np.zeros(shape=(1, 0, 2), dtype=int)
+            return
+        if num_scenarios == 'all' or num_scenarios >= num_combinations(len(self.deck_arr), num_cards):
+            combos = combinations(range(len(self.deck_arr)), num_cards)
+            while True:
+                combo_idx = np.fromiter(chain.from_iterable(islice(combos, chunk_size)), int).reshape(-1, num_cards)
+                if len(combo_idx) == 0:
+                    return
+                yield self.deck_arr[combo_idx]
+        else:
+            for start in range(0, num_scenarios, chunk_size):
+                num_rows = min(chunk_size, num_scenarios - start)
+                # The positions of the num_cards smallest random keys are a uniform sample without replacement
+                combo_idx = np.argpartition(self.rng.random((num_rows, len(self.deck_arr))), num_cards - 1,
+                                            axis=1)[:, :num_cards]
+                yield self.deck_arr[combo_idx]
+
     def simulate(self, num_scenarios=150000, odds_type="tie_win", final_hand=False):
         raise NotImplementedError
 
+    def simulate_incremental(self, num_scenarios=75000, odds_type="tie_win", final_hand=False, min_scenarios=1000):
+        # Street-by-street equity for a live game. Every scenario stores the final rank of each player, which
+        # doesn't change as its cards are dealt, so when the turn or river arrives the scenarios of the last call
+        # whose undrawn cards contain the new community cards are reused as they are. The scenarios are
+        # resampled when the hands change or fewer than min_scenarios (or every possible completion) survive.
+        start = timeit.default_timer()
+        undrawn_combos, res_arr = self.incremental_scenarios(min_scenarios)
+        if undrawn_combos is None:
+            community_cards, undrawn_combos = self.simulation_preparation(num_scenarios)
+            res_arr = self.simulate_calculation(community_cards, undrawn_combos)
+        self.scenario_cache = {"player_cards": self.player_card_codes(),
+                               "community_cards": set(card_codes(self.community_arr).tolist()),
+                               "undrawn_combos": undrawn_combos,
+                               "res_arr": res_arr}
+        outcome_dict = self.simulation_analysis(odds_type, res_arr)
+
+        if final_hand:
+            logging.info(f"{len(res_arr) * self.num_players} Simulations in {np.round(timeit.default_timer() - start, 2)}s")
+            return outcome_dict, self.hand_strength_analysis(res_arr)
+        return outcome_dict
+
+    def incremental_scenarios(self, min_scenarios):
+        # Returns the cached (undrawn_combos, res_arr) scenarios consistent with the current community cards with
+        # those cards removed from undrawn_combos, or (None, None) if they can't be reused
+        cache = self.scenario_cache
+        community_cards = set(card_codes(self.community_arr).tolist())
+        if cache is None or cache["player_cards"] != self.player_card_codes() or \
+                not cache["community_cards"] <= community_cards:
+            return None, None
+        new_cards = np.array(sorted(community_cards - cache["community_cards"]), dtype=int)
+        combo_codes = card_codes(cache["undrawn_combos"])
+        new_card_check = combo_codes[:, :, np.newaxis] == new_cards
+        consistent = new_card_check.any(axis=1).all(axis=1)
+        num_cards = 5 - len(self.community_arr)
+        if consistent.sum() < min(min_scenarios, num_combinations(len(self.deck_arr), num_cards)):
+            return None, None
+        keep_cards = ~new_card_check[consistent].any(axis=2)
+        undrawn_combos = cache["undrawn_combos"][consistent][keep_cards].reshape(consistent.sum(), num_cards, 2)
+        return undrawn_combos, cache["res_arr"][consistent]
+
+    def player_card_codes(self):
+        return [card_codes(self.player_hands[player].card_arr).tolist() for player in sorted(self.player_hands)]
+
     def simulate_calculation(self, community_cards, undrawn_combos):
         raise NotImplementedError
 
@@ -77,50 +157,68 @@ class Table:
         raise NotImplementedError
 
     def hand_strength_analysis(self, res_arr):
-        final_hand_dict = {}
+        return self.hand_strength_percentages(self.hand_strength_counts(res_arr))
+
+    def hand_strength_counts(self, res_arr, final_hand_counts=None):
+        # Adds how often each player made each hand type to final_hand_counts
+        if final_hand_counts is None:
+            final_hand_counts = {player + 1: {} for player in range(self.num_players)}
         for player in range(self.num_players):
             hand_type, hand_freq = np.unique((res_arr // 16 ** 5)[:, player], return_counts=True)
-            final_hand_dict[player + 1] = dict(
-                zip(np.vectorize(hand_type_dict.get)(hand_type), np.round(hand_freq / hand_freq.sum() * 100, 2)))
+            for hand, freq in zip(hand_type, hand_freq):
+                hand_counts = final_hand_counts[player + 1]
+                hand_counts[hand] = hand_counts.get(hand, 0) + freq
+        return final_hand_counts
+
+    def hand_strength_percentages(self, final_hand_counts):
+        final_hand_dict = {}
+        for player, hand_counts in final_hand_counts.items():
+            num_hands = sum(hand_counts.values())
+            final_hand_dict[player] = {self.rules.hand_type_dict[hand]: np.round(hand_counts[hand] / num_hands * 100, 2)
+                                       for hand in sorted(hand_counts)}
         return final_hand_dict
 
     def simulation_analysis(self, odds_type, res_arr):
-        # Result Analysis
+        return self.outcome_percentages(self.outcome_counts(odds_type, res_arr), len(res_arr))
+
+    def outcome_percentages(self, outcome_counts, num_outcomes):
+        return {outcome: np.round(count / num_outcomes * 100, 2) for outcome, count in outcome_counts.items()}
+
+    def outcome_counts(self, odds_type, res_arr, outcome_dict=None):
+        # Result Analysis: adds the number of scenarios with each outcome to outcome_dict
         outcome_arr = (res_arr == np.expand_dims(np.max(res_arr, axis=1), axis=1))
-        num_outcomes = len(outcome_arr)
-        outcome_dict = {}
+        if outcome_dict is None:
+            outcome_dict = {}
+
+        def add_outcome(outcome_key, count):
+            outcome_dict[outcome_key] = outcome_dict.get(outcome_key, 0) + int(count)
+
         # Any Tied Win counts as a Win
         if odds_type == "win_any":
             tie_indices = np.all(outcome_arr, axis=1)  # multi-way tie
-            outcome_dict['Tie'] = np.round(np.mean(tie_indices) * 100, 2)
+            add_outcome('Tie', np.sum(tie_indices))
 
             for player in range(self.num_players):
-                outcome_dict["Player " + str(player + 1)] = np.round(
-                    np.sum(outcome_arr[~tie_indices, player]) / num_outcomes * 100, 2)
+                add_outcome("Player " + str(player + 1), np.sum(outcome_arr[~tie_indices, player]))
         # Any Multi-way Tie/Tied Win counts as a Tie, Win must be exclusive
         elif odds_type == "tie_win":
             for player in range(self.num_players):
                 tie_win_scenarios = outcome_arr[outcome_arr[:, player] == 1].sum(axis=1)
-                outcome_dict["Player " + str(player + 1) + " Win"] = np.round(
-                    np.sum(tie_win_scenarios == 1) / num_outcomes * 100, 2)
-                outcome_dict["Player " + str(player + 1) + " Tie"] = np.round(
-                    np.sum(tie_win_scenarios > 1) / num_outcomes * 100, 2)
+                add_outcome("Player " + str(player + 1) + " Win", np.sum(tie_win_scenarios == 1))
+                add_outcome("Player " + str(player + 1) + " Tie", np.sum(tie_win_scenarios > 1))
         elif odds_type == "precise":
+            # Pack each scenario's set of winners into one integer and count every set in a single pass
+            winner_sets = outcome_arr.astype(np.int64) @ (1 << np.arange(self.num_players, dtype=np.int64))
+            winner_set_counts = np.bincount(winner_sets, minlength=1 << self.num_players)
 
             for num_player in range(1, self.num_players + 1):
                 for player_arr in comb_index(self.num_players, num_player):
-                    temp_arr = np.ones(shape=(outcome_arr.shape[0]), dtype=bool)
-                    for player in player_arr:
-                        temp_arr = (temp_arr & (outcome_arr[:, player] == 1))
-                    for non_player in [player for player in range(self.num_players) if player not in player_arr]:
-                        temp_arr = (temp_arr & (outcome_arr[:, non_player] == 0))
-
                     if len(player_arr) == 1:
                         outcome_key = f"Player {player_arr[0] + 1} Win"
                     else:
                         outcome_key = f"Player {','.join([str(player + 1) for player in player_arr])} Tie"
 
-                    outcome_dict[outcome_key] = np.round(temp_arr.sum() / num_outcomes * 100, 2)
+                    add_outcome(outcome_key, winner_set_counts[np.sum(1 << player_arr)])
         return outcome_dict
 
     def next_round(self, verbose=True):
@@ -145,7 +243,7 @@ class Table:
 
 
     def random_card(self, num_cards):
-        rand_indices = np.array(random.sample(range(len(self.deck_arr)), num_cards))
+        rand_indices = self.rng.choice(len(self.deck_arr), num_cards, replace=False)
         return self.deck_arr[rand_indices]
 
     def view_table(self):
@@ -176,20 +274,71 @@ class Table:
             player_hand_type[player] = np.max(player_res_arr) // 16 ** 5
 
         if (np.max(player_rank) == player_rank).sum() == 1:
-            return f"Player {np.argmax(player_rank) + 1} wins with a {hand_type_dict[player_hand_type[np.argmax(player_rank)]]}"
+            return f"Player {np.argmax(player_rank) + 1} wins with a {self.rules.hand_type_dict[player_hand_type[np.argmax(player_rank)]]}"
         else:
             winners, = np.where(np.max(player_rank) == player_rank)
-            return f"Player {', '.join((winners + 1).astype(str))} ties with a {hand_type_dict[player_hand_type[winners[0]]]}"
+            return f"Player {', '.join((winners + 1).astype(str))} ties with a {self.rules.hand_type_dict[player_hand_type[winners[0]]]}"
+
+
+# Ranks the final cards of players, shape (..., hand_limit + 5, 2) with the hole cards first: the best five of
+# any of the cards for hold'em, exactly two hole cards and three community cards for Omaha
+def rank_player_cards(cur_player_cards, rules, hand_limit):
+    if hand_limit == 4:
+        return Ranker.rank_omaha(cur_player_cards, rules)
+    return Ranker.rank_direct(cur_player_cards, rules)
+
+
+# Ranks the scenarios start:stop of a parallel simulation in a worker process. undrawn_combos and res_arr live in
+# shared memory, so only the names of the blocks and the player cards are sent to the worker.
+def attach_shared_memory(name):
+    # Attaches a worker to a block owned by the parent, which unlinks it. Python 3.13 can attach without handing
+    # the block to the resource tracker. Older versions always register it; workers of
+    # parallel_holdem_calc.get_pool share the parent's tracker, which keeps a single registration per block that
+    # the parent's unlink releases.
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    return shared_memory.SharedMemory(name=name)
+
+
+def rank_shard(task):
+    combos_name, combos_shape, res_name, res_shape, player_cards, community_arr, rules, hand_limit, start, stop = task
+    combos_memory = attach_shared_memory(combos_name)
+    res_memory = attach_shared_memory(res_name)
+    try:
+        undrawn_combos = np.ndarray(combos_shape, dtype=np.int64, buffer=combos_memory.buf)[start:stop]
+        res_arr = np.ndarray(res_shape, dtype=np.int64, buffer=res_memory.buf)
+        num_rows = stop - start
+        for player, card_arr in enumerate(player_cards):
+            cur_player_cards = np.concatenate(
+                [np.broadcast_to(card_arr, (num_rows,) + card_arr.shape),
+                 np.broadcast_to(community_arr, (num_rows,) + community_arr.shape),
+                 undrawn_combos], axis=1)
+            res_arr[start:stop, player] = rank_player_cards(cur_player_cards, ranking_rules[rules], hand_limit)
+        del undrawn_combos, res_arr
+    finally:
+        combos_memory.close()
+        res_memory.close()
 
 
 class Engine(Table):
 
-    def __init__(self, num_players, deck_type='full'):
-        super(Engine, self).__init__(num_players=num_players,
-                                          hand_limit=2,
-                                          deck_type=deck_type)
+    hand_limit = 2
 
-    def simulate(self, num_scenarios=75000, odds_type="tie_win", final_hand=False):
+    # parallel: split the scenarios of each simulation into shards ranked by the worker pool of
+    # parallel_holdem_calc, which is reused between calls, instead of one thread per player
+    def __init__(self, num_players, deck_type='full', parallel=False, rules=None, seed=None):
+        super(Engine, self).__init__(num_players=num_players,
+                                          hand_limit=self.hand_limit,
+                                          deck_type=deck_type,
+                                          rules=rules,
+                                          seed=seed)
+        self.parallel = parallel
+
+    def simulate(self, num_scenarios=75000, odds_type="tie_win", final_hand=False, chunk_size=None):
+        # chunk_size: stream the scenarios in chunks of at most chunk_size rows, so that memory use is bounded by
+        # the chunk size instead of the number of scenarios
+        if chunk_size is not None:
+            return self.simulate_streaming(num_scenarios, odds_type, final_hand, chunk_size)
 
         start = timeit.default_timer()
         community_cards, undrawn_combos = self.simulation_preparation(num_scenarios)
@@ -204,13 +353,40 @@ class Engine(Table):
 
         if final_hand:
             final_hand_dict = self.hand_strength_analysis(res_arr)
-            logging.info(f"{min([len(undrawn_combos), num_scenarios]) * 21 * self.num_players} Simulations in {np.round(timeit.default_timer() - start, 2)}s")
+            logging.info(f"{len(undrawn_combos) * self.num_players} Simulations in {np.round(timeit.default_timer() - start, 2)}s")
             return outcome_dict, final_hand_dict
 
-        #logging.info(f"{min([len(undrawn_combos), num_scenarios]) * 21 * self.num_players} Simulations in {np.round(timeit.default_timer() - start, 2)}s")
+        #logging.info(f"{len(undrawn_combos) * self.num_players} Simulations in {np.round(timeit.default_timer() - start, 2)}s")
+        return outcome_dict
+
+    def simulate_streaming(self, num_scenarios, odds_type, final_hand, chunk_size):
+
+        start = timeit.default_timer()
+        self.check_starting_hands()
+
+        outcome_counts, final_hand_counts, num_outcomes = {}, None, 0
+        for undrawn_combos in self.undrawn_combo_chunks(num_scenarios, chunk_size):
+            if len(self.community_arr) > 0:
+                community_cards = np.repeat([self.community_arr], len(undrawn_combos), axis=0)
+            else:
+                community_cards = None
+            res_arr = self.simulate_calculation(community_cards, undrawn_combos)
+            self.outcome_counts(odds_type, res_arr, outcome_counts)
+            if final_hand:
+                final_hand_counts = self.hand_strength_counts(res_arr, final_hand_counts)
+            num_outcomes += len(res_arr)
+        outcome_dict = self.outcome_percentages(outcome_counts, num_outcomes)
+
+        if final_hand:
+            logging.info(f"{num_outcomes * self.num_players} Simulations in {np.round(timeit.default_timer() - start, 2)}s")
+            return outcome_dict, self.hand_strength_percentages(final_hand_counts)
         return outcome_dict
 
     def simulate_calculation(self, community_cards, undrawn_combos):
+        if self.parallel:
+            num_shards = min(multiprocessing.cpu_count(), len(undrawn_combos) // min_shard_rows)
+            if num_shards > 1:
+                return self.simulate_calculation_parallel(undrawn_combos, num_shards)
         res_arr = np.zeros(shape=(len(undrawn_combos), self.num_players), dtype=int)
         if self.num_players >= 2:
             Parallel(n_jobs=multiprocessing.cpu_count(), backend="threading") \
@@ -220,6 +396,27 @@ class Engine(Table):
                 self.gen_single_hand(community_cards, player, undrawn_combos, res_arr)
         return res_arr
 
+    def simulate_calculation_parallel(self, undrawn_combos, num_shards):
+        res_shape = (len(undrawn_combos), self.num_players)
+        player_cards = [self.player_hands[player + 1].card_arr.astype(np.int64) for player in range(self.num_players)]
+        combos_memory = shared_memory.SharedMemory(create=True, size=max(1, undrawn_combos.size * 8))
+        res_memory = shared_memory.SharedMemory(create=True, size=max(1, len(undrawn_combos) * self.num_players * 8))
+        try:
+            np.ndarray(undrawn_combos.shape, dtype=np.int64, buffer=combos_memory.buf)[:] = undrawn_combos
+            bounds = [len(undrawn_combos) * shard // num_shards for shard in range(num_shards + 1)]
+            community_arr = self.community_arr.astype(np.int64).reshape(-1, 2)
+            tasks = [(combos_memory.name, undrawn_combos.shape, res_memory.name, res_shape, player_cards,
+                      community_arr, self.rules.name, self.hand_limit, bounds[shard], bounds[shard + 1])
+                     for shard in range(num_shards) if bounds[shard] < bounds[shard + 1]]
+            list(parallel_holdem_calc.get_pool().map(rank_shard, tasks))
+            res_arr = np.ndarray(res_shape, dtype=np.int64, buffer=res_memory.buf).copy()
+        finally:
+            combos_memory.close()
+            combos_memory.unlink()
+            res_memory.close()
+            res_memory.unlink()
+        return res_arr
+
     def gen_single_hand(self, community_cards, player, undrawn_combos, res_arr):
         if community_cards is None:
             cur_player_cards = np.concatenate(
@@ -230,4 +427,12 @@ class Engine(Table):
                 [np.repeat([self.player_hands[player + 1].card_arr], len(undrawn_combos), axis=0),
                  community_cards,
                  undrawn_combos], axis=1)
-        res_arr[:, player] = Ranker.rank_all_hands(cur_player_cards[:, comb_index(7, 5), :])
\ No newline at end of file
+        res_arr[:, player] = rank_player_cards(cur_player_cards, self.rules, self.hand_limit)
+
+
+class OmahaEngine(Engine):
+
+    # Omaha hold'em: four hole cards, of which every hand uses exactly two with three community cards. Each
+    # scenario ranks 60 five card hands per player in chunks of ranker.omaha_chunk_rows scenarios, and
+    # simulate(..., chunk_size=n) also bounds the scenarios held at once.
+    hand_limit = 4
@@ -1,3 +1,4 @@
+import os
 import numpy as np
 from math import factorial
 from itertools import combinations, chain
@@ -15,11 +16,46 @@ def num_combinations(total, selected):
     return int(factorial(total)/(factorial(selected)*factorial(total-selected)))
 
 
-def comb_index(n, k):
+# Read-only combination index arrays keyed by (n, k). Tables with at least comb_index_mmap_rows rows (the deck
+# tables) are also saved to comb_index_directory and memory-mapped from there by later processes.
+comb_index_registry = {}
+comb_index_directory = os.environ.get("SPADE_CACHE_DIR",
+                                      os.path.join(os.path.expanduser("~"), ".cache", "spade"))
+comb_index_mmap_rows = 100000
+
+
+def build_comb_index(n, k):
     count = comb(n, k, exact=True)
     index = np.fromiter(chain.from_iterable(combinations(range(n), k)),
                         int, count=count*k)
-    return index.reshape(-1, k)
+    return index.reshape(count, k)
+
+
+def load_comb_index(n, k):
+    path = os.path.join(comb_index_directory, f"comb_index_{n}_{k}.npy")
+    if os.path.exists(path):
+        return np.load(path, mmap_mode='r')
+    index = build_comb_index(n, k)
+    try:
+        os.makedirs(comb_index_directory, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp.npy"
+        np.save(temp_path, index)
+        os.replace(temp_path, path)
+        return np.load(path, mmap_mode='r')
+    except OSError:
+        # Unwritable cache directory: keep the table in memory
+        return index
+
+
+def comb_index(n, k):
+    if (n, k) not in comb_index_registry:
+        if comb(n, k, exact=True) >= comb_index_mmap_rows:
+            index = load_comb_index(n, k)
+        else:
+            index = build_comb_index(n, k)
+        index.flags.writeable = False
+        comb_index_registry[(n, k)] = index
+    return comb_index_registry[(n, k)]
 
 def card_str_to_arr(card_str):
     return np.array([[num_dict[card[0]], suit_dict[card[1]]] for card in card_str])
@@ -28,6 +64,12 @@ def card_str_to_arr(card_str):
 def card_arr_to_str(card_arr):
     return [rev_num_dict[card[0]] + rev_suit_dict[card[1]] for card in card_arr]
 
+
+def card_codes(card_arr):
+    # One integer per [value, suit] card, for comparing cards with a single equality
+    card_arr = np.asarray(card_arr, dtype=int)
+    return card_arr[..., 0] * 4 + card_arr[..., 1]
+
 #
 # def add_card(card, card_arr):
 #     if type(card) == str:
@@ -80,6 +122,76 @@ def add_card(card, card_arr):
             ], axis=0)
     return card_arr
 
+# Deck slot of each card: (value - 2) * 4 + suit, which orders the slots like Table.generate_deck
+slot_cards = np.array([[value, suit] for value in range(2, 15) for suit in range(4)])
+value_lookup = np.full(256, -1)
+suit_lookup = np.full(256, -1)
+value_lookup[[ord(num) for num in num_dict]] = list(num_dict.values())
+suit_lookup[[ord(suit) for suit in suit_dict]] = list(suit_dict.values())
+
+
+def card_slots(cards):
+    # Parses card strings ("Ah"), [value, suit] cards or arrays of either into deck slots in one vectorized pass
+    if isinstance(cards, str) or (len(cards) and isinstance(cards[0], str)):
+        card_str = [cards] if isinstance(cards, str) else list(cards)
+        if any(len(card) != 2 for card in card_str):
+            raise CardException(f"Invalid cards: {' '.join(card_str)}")
+        char_codes = np.frombuffer("".join(card_str).encode("latin-1", "replace"), dtype=np.uint8).reshape(-1, 2)
+        card_arr = np.stack([value_lookup[char_codes[:, 0]], suit_lookup[char_codes[:, 1]]], axis=1)
+        if (card_arr < 0).any():
+            raise CardException(f"Invalid cards: {' '.join(card_str)}")
+    else:
+        card_arr = np.asarray(cards, dtype=int).reshape(-1, 2)
+        valid = (card_arr[:, 0] >= 2) & (card_arr[:, 0] <= 14) & (card_arr[:, 1] >= 0) & (card_arr[:, 1] <= 3)
+        if not valid.all():
+            raise CardException(f"Invalid cards: {card_arr[~valid].tolist()}")
+    return (card_arr[:, 0] - 2) * 4 + card_arr[:, 1]
+
+
+class Deck:
+    # Cards left in a deck as a fixed 52-slot mask: adding and removing cards flips slots instead of rebuilding
+    # the card array, which is only materialized when card_arr is read after a change
+    def __init__(self, deck_type='full'):
+        if deck_type == "full":
+            self.mask = np.ones(52, dtype=bool)
+        elif deck_type == "short":
+            self.mask = slot_cards[:, 0] >= 6
+        else:
+            raise DeckException("Invalid Deck Type. Valid options are: Full/Short ")
+        self.deck_type = deck_type
+        self._card_arr = None
+
+    def remove(self, cards):
+        slots = card_slots(cards)
+        missing = ~self.mask[slots]
+        if missing.any():
+            raise DeckException(f"Card {' '.join(card_arr_to_str(slot_cards[slots[missing]]))} is not in the Deck")
+        if len(np.unique(slots)) < len(slots):
+            raise DeckException("Cannot remove the same card twice")
+        self.mask[slots] = False
+        self._card_arr = None
+
+    def add(self, cards):
+        slots = card_slots(cards)
+        if self.mask[slots].any() or len(np.unique(slots)) < len(slots):
+            raise DeckException(f"Card {' '.join(card_arr_to_str(slot_cards[slots]))} is already in the Deck")
+        self.mask[slots] = True
+        self._card_arr = None
+
+    @property
+    def card_arr(self):
+        if self._card_arr is None:
+            self._card_arr = slot_cards[self.mask]
+            self._card_arr.flags.writeable = False
+        return self._card_arr
+
+    def __contains__(self, card):
+        return bool(self.mask[card_slots(card)].all())
+
+    def __len__(self):
+        return int(self.mask.sum())
+
+
 def format_cards(cards):
     if type(cards) == np.ndarray and cards.ndim == 1:
         return [cards]
@@ -2,7 +2,7 @@ import csv
 import time
 from datetime import datetime
 
-from server.src.engine import holdem_calc, parallel_holdem_calc
+from server.src.engine import holdem_cache, holdem_calc, parallel_holdem_calc
 from server.src.game.betting_round import BettingRound
 from server.src.game.hand_analysis.winner_determiner import WinnerAnalyzer
 from server.src.game.input import modify_game_settings
@@ -231,17 +231,17 @@ class GameRound:
         # print("Updated pnl_matrix:", self.pnl_matrix)
 
     def calculate_probabilities(self, river=False):
-        # Create abbreviations for community and player cards
-        community_cards = [c.abbreviation for c in self.community_cards]
         player_cards = []
 
         # Add cards from each player to player cards
         for player in self.active_players:
-            player_cards.extend([c.abbreviation for c in player.cards])
+            player_cards.extend(player.cards)
 
         # Use engine to calculate probs: SCHULDIG: DESHALB KACKE MIT TERMINAL OUTPUT
-        # Can use parallel to be faster
-        probs = parallel_holdem_calc.calculate(community_cards, False, 10e3, None, player_cards, False)
+        # Can use parallel to be faster; the cache answers repeated spots instantly
+        # The Cards go to the engine as they are, without the string parsing of the command line path
+        probs = holdem_cache.calculate(self.community_cards, False, 10e3, None, player_cards, False,
+                                       parallel_holdem_calc.calculate_cards)
 
         print(probs)
 
@@ -258,6 +258,8 @@ class GameRound:
             'round': round_name,
             'pot': self.pot,
             'community_cards': [str(card) for card in self.community_cards],
+            'player_cards': {player.name: [card.abbreviation for card in player.cards]
+                             for player in self.active_players},
             'player_bets': {player.name: self.bets[player.name] for player in self.players},
             'player_balances': {player.name: player.balance for player in self.players}
         }
@@ -268,7 +270,7 @@ class GameRound:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"poker_game_log_{timestamp}.csv"
         with open(filename, 'w', newline='') as csvfile:
-            fieldnames = ['round', 'pot', 'community_cards', 'player_bets', 'player_balances']
+            fieldnames = ['round', 'pot', 'community_cards', 'player_cards', 'player_bets', 'player_balances']
             writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
             writer.writeheader()
             for entry in self.round_logs:
@@ -276,6 +278,7 @@ class GameRound:
                     'round': entry['round'],
                     'pot': entry['pot'],
                     'community_cards': ', '.join(entry['community_cards']),
+                    'player_cards': ', '.join([f"{k}: {' '.join(v)}" for k, v in entry['player_cards'].items()]),
                     'player_bets': ', '.join([f"{k}: {v}" for k, v in entry['player_bets'].items()]),
                     'player_balances': ', '.join([f"{k}: {v}" for k, v in entry['player_balances'].items()])
                 })
@@ -0,0 +1,107 @@
+import csv
+import multiprocessing
+
+import numpy as np
+
+from server.src.engine import holdem_evaluator, holdem_functions, parallel_holdem_calc
+from server.src.game.resources.card import Card, all_cards
+
+# Records per worker task; smaller batches are scored in this process
+showdown_chunk_rows = 20000
+# Card code of every card as written to the community_cards column of GameRound.save_logs ("ACE of SPADES")
+logged_card_codes = {repr(card): card.code for card in all_cards}
+
+
+def card_code(card):
+    """Returns the engine card code (0-51) of a game Card, a card string like "Ah" or a code."""
+    if isinstance(card, Card):
+        return card.code
+    return holdem_functions.card_to_code(card)
+
+
+def encode_showdowns(records):
+    """
+    Encodes showdown records into card code arrays.
+
+    :param records: (hole_cards, board) pairs; hole_cards holds one pair of cards per player, board five cards.
+    :return: hole codes of shape (records, players, 2), padded with -1 for tables with fewer players,
+             and board codes of shape (records, 5).
+    """
+    num_players = max(len(hole_cards) for hole_cards, _ in records)
+    hole_codes = np.full((len(records), num_players, 2), -1, dtype=np.int64)
+    board_codes = np.empty((len(records), 5), dtype=np.int64)
+    for index, (hole_cards, board) in enumerate(records):
+        if len(board) != 5:
+            raise ValueError("A showdown needs 5 community cards.")
+        hole_codes[index, :len(hole_cards)] = [[card_code(card) for card in cards] for cards in hole_cards]
+        board_codes[index] = [card_code(card) for card in board]
+    return hole_codes, board_codes
+
+
+def score_showdowns(codes):
+    """Scores every player of every record; players missing from a record (code -1) score -1."""
+    hole_codes, board_codes = codes
+    board_masks = holdem_evaluator.codes_to_mask_array(board_codes)
+    hole_masks = holdem_evaluator.codes_to_mask_array(np.maximum(hole_codes, 0))
+    scores = holdem_evaluator.evaluate_mask_array(hole_masks | board_masks[:, None])
+    return np.where(hole_codes[:, :, 0] >= 0, scores, -1)
+
+
+def analyze_showdowns(records, parallel=True):
+    """
+    Determines the winners of many showdowns at once, e.g. the hands read by read_showdown_log.
+
+    :param records: (hole_cards, board) pairs, cards given as game Cards, card strings or engine codes.
+    :param parallel: spread batches of showdown_chunk_rows records over the engine's worker pool.
+    :return: dict of columns with one row per record and one column per player:
+             'scores' (higher is better, -1 for missing players), 'hand_types' (index into
+             holdem_functions.hand_rankings, -1 for missing players), 'winners' (mask of the players sharing
+             the pot), 'num_winners' and 'split' (more than one winner) per record. An empty batch gives empty
+             columns.
+    """
+    if not records:
+        return {'scores': np.empty((0, 0), dtype=np.int64), 'hand_types': np.empty((0, 0), dtype=np.int64),
+                'winners': np.empty((0, 0), dtype=bool), 'num_winners': np.empty(0, dtype=np.int64),
+                'split': np.empty(0, dtype=bool)}
+    hole_codes, board_codes = encode_showdowns(records)
+    num_chunks = -(-len(records) // showdown_chunk_rows)
+    if parallel and num_chunks > 1 and multiprocessing.cpu_count() > 1:
+        bounds = range(0, len(records), showdown_chunk_rows)
+        tasks = [(hole_codes[start:start + showdown_chunk_rows], board_codes[start:start + showdown_chunk_rows])
+                 for start in bounds]
+        scores = np.concatenate(parallel_holdem_calc.get_pool().map(score_showdowns, tasks))
+    else:
+        scores = score_showdowns((hole_codes, board_codes))
+
+    winners = scores == scores.max(axis=1, keepdims=True)
+    num_winners = winners.sum(axis=1)
+    return {
+        'scores': scores,
+        'hand_types': np.where(scores >= 0, holdem_evaluator.hand_type_array(np.maximum(scores, 0)), -1),
+        'winners': winners,
+        'num_winners': num_winners,
+        'split': num_winners > 1,
+    }
+
+
+def read_showdown_log(filename):
+    """
+    Reads the showdowns from a game log written by GameRound.save_logs: every River entry with at least two
+    remaining players.
+
+    :return: list of player names per showdown and the matching (hole_cards, board) records for
+             analyze_showdowns.
+    """
+    names, records = [], []
+    with open(filename, newline='') as csvfile:
+        for row in csv.DictReader(csvfile):
+            if row['round'] != 'River' or not row.get('player_cards'):
+                continue
+            # player_cards: "Alice: Ah Kd, Bob: 7c 7s"
+            players = [entry.split(': ') for entry in row['player_cards'].split(', ')]
+            if len(players) < 2:
+                continue
+            board = [logged_card_codes[card] for card in row['community_cards'].split(', ')]
+            names.append([name for name, _ in players])
+            records.append(([cards.split() for _, cards in players], board))
+    return names, records
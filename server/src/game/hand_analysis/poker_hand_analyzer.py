@@ -1,6 +1,5 @@
-from itertools import combinations
-
-from server.src.game.utils.game_utils import has_duplicate_cards, get_duplicate_cards, evaluate_hand, tie_breaker
+from server.src.game.utils.game_utils import has_duplicate_cards, get_duplicate_cards, best_hand_cards, \
+    score_hand_type
 
 
 class PokerHandAnalyzer:
@@ -23,18 +22,8 @@ class PokerHandAnalyzer:
         Ermittelt die beste 5-Karten-Hand aus den 7 gegebenen Karten und gibt eine strukturierte Ausgabe zurück,
         die den Handtyp und wichtige Informationen zur Hand (wie Kickers) enthält.
         """
-        best_hand = None
-        best_hand_type = None
-
-        for combination in combinations(self.cards, 5):
-            hand_type, attr = evaluate_hand(combination)
-
-            if best_hand_type is None or hand_type < best_hand_type:
-                best_hand_type = hand_type
-                best_hand = (combination, attr)
-            elif hand_type == best_hand_type:
-                best_combination, best_attr = best_hand  # Unpack properly
-                best_hand, _ = tie_breaker(hand_type, combination, attr, best_attr, best_hand)
+        score, best_hand = best_hand_cards(self.cards)
+        best_hand_type = score_hand_type(score)
 
         # Mapping integer values to poker hands
         best_hand_dict = {
@@ -50,4 +39,4 @@ class PokerHandAnalyzer:
             10: "High Card"
         }
 
-        return best_hand_dict.get(best_hand_type), best_hand[0]
+        return best_hand_dict.get(best_hand_type), best_hand
@@ -1,6 +1,6 @@
 from collections import Counter
 
-from server.src.game.resources.card import Rank
+from server.src.game.resources.card import rank_values
 
 
 # Helper function to determine the number of different ranks in a hand
@@ -15,22 +15,6 @@ def get_rank_counts(hand):
 
 # Helper function to determine the value of a rank
 def rank_value(rank):
-    rank_values = {
-        Rank.TWO: 2,
-        Rank.THREE: 3,
-        Rank.FOUR: 4,
-        Rank.FIVE: 5,
-        Rank.SIX: 6,
-        Rank.SEVEN: 7,
-        Rank.EIGHT: 8,
-        Rank.NINE: 9,
-        Rank.TEN: 10,
-        Rank.JACK: 11,
-        Rank.QUEEN: 12,
-        Rank.KING: 13,
-        Rank.ACE: 14
-    }
-
     """
     Returns the numeric value of a rank to compare card values.
     Example: TWO = 2, THREE = 3, ..., ACE = 14.
@@ -62,13 +46,13 @@ def is_straight(hand):
     Checks if the cards in the hand have consecutive ranks.
     Also handles the special case of A-2-3-4-5 (Ace-low straight).
     """
-    ranks = sorted([rank_value(card.rank) for card in hand])  # Sorts the ranks of the hand
+    ranks = sorted([card.value for card in hand])  # Sorts the ranks of the hand
     # Special case: Ace can be used as 1 in the sequence A-2-3-4-5 with 5 as the high card
     if ranks == [2, 3, 4, 5, 14]:
-        return True, next((card for card in hand if rank_value(card.rank) == 5), None)
+        return True, next((card for card in hand if card.value == 5), None)
     # Checks if the ranks form a consecutive sequence
     return all(ranks[i] + 1 == ranks[i + 1] for i in range(len(ranks) - 1)), max(hand,
-                                                                                 key=lambda card: rank_value(card.rank))
+                                                                                 key=lambda card: card.value)
 
 
 # Checks if the hand contains four cards of the same rank (Four of a Kind)
@@ -80,8 +64,8 @@ def is_four_of_a_kind(hand):
     counts = get_rank_counts(hand)  # Counts the frequencies of ranks in the hand
     if 4 in counts.values():
         four_of_a_kind_rank = max([card for card in hand if counts[card.rank] == 4],
-                                  key=lambda card: rank_value(card.rank))
-        kicker = max([card for card in hand if counts[card.rank] != 4], key=lambda card: rank_value(card.rank))
+                                  key=lambda card: card.value)
+        kicker = max([card for card in hand if counts[card.rank] != 4], key=lambda card: card.value)
         return True, four_of_a_kind_rank, kicker
     return False, None, None
 
@@ -117,7 +101,7 @@ def is_three_of_a_kind(hand):
         # Use a for loop to add the ranks of the kickers
         for card in hand:
             if card.rank != three_of_a_kind_rank:
-                kicker_ranks.append(rank_value(card.rank))
+                kicker_ranks.append(card.value)
 
         # Sort the kicker ranks in descending order and select the top 2 kickers
         kicker_ranks = sorted(kicker_ranks, reverse=True)[:2]
@@ -140,7 +124,7 @@ def is_two_pair(hand):
     counts = get_rank_counts(hand)  # Counts the frequencies of ranks in the hand
     if list(counts.values()).count(2) == 2:
         pairs = sorted([rank for rank, count in counts.items() if count == 2], key=rank_value, reverse=True)
-        kicker = max([card for card in hand if card.rank not in pairs], key=lambda card: rank_value(card.rank))
+        kicker = max([card for card in hand if card.rank not in pairs], key=lambda card: card.value)
         return True, pairs[0], pairs[1], kicker
     return False, None, None, None
 
@@ -163,7 +147,7 @@ def is_one_pair(hand):
         # Use a for loop to collect the ranks of the kickers
         for card in hand:
             if card.rank != pair_rank:
-                kicker_ranks.append(rank_value(card.rank))
+                kicker_ranks.append(card.value)
 
         # Sort the kicker ranks in descending order and select the top 3 kickers
         kicker_ranks = sorted(kicker_ranks, reverse=True)[:3]
@@ -185,7 +169,7 @@ def high_card(hand):
     Typically used when no other combinations are present.
     """
     # Sort the hand by rank in descending order
-    sorted_hand = sorted(hand, key=lambda card: rank_value(card.rank), reverse=True)
+    sorted_hand = sorted(hand, key=lambda card: card.value, reverse=True)
 
     # Assign high card and four kickers individually
     high_card = sorted_hand[0]
@@ -1,4 +1,5 @@
-from server.src.game.utils.game_utils import evaluate_hand, tie_breaker, translate_winner_hands
+from server.src.game.utils.game_utils import evaluate_hand, hand_score, score_hand_type, \
+    translate_winner_hands
 
 
 class WinnerAnalyzer:
@@ -12,35 +13,12 @@ class WinnerAnalyzer:
 
         :return: A list of tuples containing player names and their best hands.
         """
-        winners = []
-        best_hand = None
-        best_hand_type = None
+        scores = [(player_name, player_cards, hand_score(player_cards)) for player_name, player_cards in self.players]
+        best_score = max(score for _, _, score in scores)
 
-        # Loop through each player in the array
-        for player_name, player_cards in self.players:
-            hand_type, attr = evaluate_hand(player_cards)
-
-            if best_hand_type is None or hand_type < best_hand_type:
-                best_hand_type = hand_type
-                best_hand = (sorted(player_cards), attr)
-
-                winners.clear()
-                winners.append((player_name, best_hand_type, best_hand))
-
-            elif hand_type == best_hand_type:
-                best_combination, best_attr = best_hand  # Unpack properly
-
-                temp = best_hand
-                best_hand, split_pot = tie_breaker(hand_type, sorted(player_cards), attr, best_attr, best_hand)
-
-                if split_pot:
-                    winners.append((player_name, best_hand_type, best_hand))
-                elif temp != best_hand:
-                    best_hand_type = hand_type
-                    best_hand = (sorted(player_cards), attr)
-
-                    winners.clear()
-                    winners.append((player_name, best_hand_type, best_hand))
+        # Beschreibende Attribute werden nur noch für die Gewinner (Anzeige) ermittelt
+        winners = [(player_name, score_hand_type(score), (sorted(player_cards), evaluate_hand(player_cards)[1]))
+                   for player_name, player_cards, score in scores if score == best_score]
 
         winners = translate_winner_hands(winners)
 
@@ -51,12 +51,37 @@ rank_mapping = {
 }
 
 
-# The Card class, using Suit and Rank enums
+# Numeric value of every rank (TWO = 2 ... ACE = 14) and index of every suit, in the suit order of the
+# equity engine's card codes (holdem_functions.suit_index_dict)
+rank_values = {rank: value for value, rank in enumerate(Rank, start=2)}
+suit_indices = {Suit.SPADES: 0, Suit.CLUBS: 1, Suit.HEARTS: 2, Suit.DIAMONDS: 3}
+
+
+# The Card class, using Suit and Rank enums. There is exactly one immutable Card per suit and rank:
+# Card(suit, rank) returns the interned instance, so creating, hashing and comparing cards does not allocate.
 class Card:
-    def __init__(self, suit: Suit, rank: Rank):
-        self.suit = suit
-        self.rank = rank
-        self.abbreviation = rank_mapping[rank] + suit_mapping[suit]
+    __slots__ = ('suit', 'rank', 'abbreviation', 'value', 'suit_index', 'code')
+    interned = {}
+
+    def __new__(cls, suit: Suit, rank: Rank):
+        card = cls.interned.get((suit, rank))
+        if card is None:
+            card = super().__new__(cls)
+            object.__setattr__(card, 'suit', suit)
+            object.__setattr__(card, 'rank', rank)
+            object.__setattr__(card, 'abbreviation', rank_mapping[rank] + suit_mapping[suit])
+            object.__setattr__(card, 'value', rank_values[rank])  # 2 ... 14
+            object.__setattr__(card, 'suit_index', suit_indices[suit])
+            object.__setattr__(card, 'code', suit_indices[suit] * 13 + rank_values[rank] - 2)  # 0 ... 51
+            cls.interned[(suit, rank)] = card
+        return card
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Cards are immutable.")
+
+    def __reduce__(self):
+        # Unpickled and copied cards are the interned instances as well
+        return Card, (self.suit, self.rank)
 
     def __repr__(self):
         # Returns a user-friendly representation of the card
@@ -64,30 +89,18 @@ class Card:
 
     def __eq__(self, other):
         if isinstance(other, Card):
-            return self.suit == other.suit and self.rank == other.rank
+            return self.code == other.code
         return False
 
     def __hash__(self):
-        return hash((self.rank, self.suit))
+        return self.code
 
     def __lt__(self, other):
         """Less than method for comparing cards, only by rank."""
         if isinstance(other, Card):
-            # Custom ordering for ranks
-            rank_order = {
-                Rank.TWO: 2,
-                Rank.THREE: 3,
-                Rank.FOUR: 4,
-                Rank.FIVE: 5,
-                Rank.SIX: 6,
-                Rank.SEVEN: 7,
-                Rank.EIGHT: 8,
-                Rank.NINE: 9,
-                Rank.TEN: 10,
-                Rank.JACK: 11,
-                Rank.QUEEN: 12,
-                Rank.KING: 13,
-                Rank.ACE: 14
-            }
-            return rank_order[self.rank] < rank_order[other.rank]
+            return self.value < other.value
         return NotImplemented
+
+
+# All 52 cards in Suit and Rank order
+all_cards = tuple(Card(suit, rank) for suit in Suit for rank in Rank)
@@ -1,6 +1,6 @@
 import random
 
-from server.src.game.resources.card import Card, Suit, Rank
+from server.src.game.resources.card import all_cards
 
 
 class Deck:
@@ -8,20 +8,26 @@ class Deck:
     """Create a randomly shuffled deck of cards"""
     def __init__(self):
         """Initialisiert ein Standard-Pokerdeck mit 52 Karten basierend auf den Suit- und Rank-Enums."""
-        self.cards = [Card(suit, rank) for suit in Suit for rank in Rank]
+        # Reihenfolge der verbleibenden Karten als Indizes in all_cards; gegeben wird vom Ende
+        self.order = list(range(len(all_cards)))
+
+    @property
+    def cards(self):
+        """Die verbleibenden Karten in Deck-Reihenfolge."""
+        return [all_cards[index] for index in self.order]
 
     def shuffle(self):
         """Mischt das Deck."""
-        random.shuffle(self.cards)
+        random.shuffle(self.order)
 
     def deal_card(self):
         """Gibt die oberste Karte vom Deck zurück."""
-        if len(self.cards) == 0:
+        if len(self.order) == 0:
             raise Exception("Das Deck ist leer.")
-        return self.cards.pop()
+        return all_cards[self.order.pop()]
 
     def __len__(self):
-        return len(self.cards)
+        return len(self.order)
 
     def __repr__(self):
         return f"Deck mit {len(self.cards)} Karten: {self.cards}"
@@ -1,6 +1,6 @@
 from collections import Counter
 
-from server.src.game.hand_analysis.poker_hand_rankings import rank_value, high_card, is_one_pair, is_two_pair, \
+from server.src.game.hand_analysis.poker_hand_rankings import high_card, is_one_pair, is_two_pair, \
     is_three_of_a_kind, \
     is_full_house, is_four_of_a_kind, is_straight, is_flush
 from server.src.game.resources.card import Rank
@@ -72,18 +72,103 @@ def translate_winner_hands(winners):
     return updated_winners
 
 
-def compare_high_cards(high_cards1, high_cards2):
-    if not isinstance(high_cards1, list):
-        high_cards1 = [high_cards1]
-    if not isinstance(high_cards2, list):
-        high_cards2 = [high_cards2]
+def straight_high(rank_mask):
+    """
+    Returns the high card value of the best straight in a bit mask of rank values, or 0 without a straight.
+    The ace also counts as 1, so A-2-3-4-5 is a five-high straight.
+    """
+    if rank_mask & (1 << 14):
+        rank_mask |= 1 << 1
+    for high in range(14, 4, -1):
+        if (rank_mask >> (high - 4)) & 0b11111 == 0b11111:
+            return high
+    return 0
 
-    for card1, card2 in zip(high_cards1, high_cards2):
-        if rank_value(card1.rank) > rank_value(card2.rank):
-            return 1
-        elif rank_value(card1.rank) < rank_value(card2.rank):
-            return -1
-    return 0  # Hands are equal
+
+def hand_score(hand):
+    """
+    Bewertet eine 5- oder 7-Karten-Hand in einem Durchlauf mit einer einzigen Ganzzahl.
+    Eine höhere Zahl ist eine bessere Hand: die Kategorie (10 - Handtyp von evaluate_hand) steht ab Bit 20,
+    darunter folgen bis zu fünf Ränge zu je 4 Bit für das Tie-Breaking. Bei 7 Karten zählen die besten 5.
+    """
+    counts = [0] * 15
+    suit_masks = {}
+    for card in hand:
+        value = card.value
+        counts[value] += 1
+        suit_masks[card.suit] = suit_masks.get(card.suit, 0) | (1 << value)
+
+    # Ränge absteigend nach Anzahl und Wert, z. B. [(3, 9), (2, 13), (1, 14)]
+    groups = sorted(((count, value) for value, count in enumerate(counts) if count), reverse=True)
+    flush_mask = next((mask for mask in suit_masks.values() if bin(mask).count("1") >= 5), 0)
+
+    if flush_mask:
+        high = straight_high(flush_mask)
+        if high:
+            return ((9 if high == 14 else 8) << 20) | (high << 16)  # Royal Flush / Straight Flush
+    if groups[0][0] == 4:
+        category, ranks = 7, [groups[0][1], max(value for _, value in groups[1:])]
+    elif groups[0][0] == 3 and len(groups) > 1 and groups[1][0] >= 2:
+        category, ranks = 6, [groups[0][1], groups[1][1]]
+    elif flush_mask:
+        category, ranks = 5, [value for value in range(14, 1, -1) if flush_mask & (1 << value)][:5]
+    else:
+        high = straight_high(sum(1 << value for _, value in groups))
+        if high:
+            return (4 << 20) | (high << 16)
+        if groups[0][0] == 3:
+            category, ranks = 3, [groups[0][1]] + sorted((value for _, value in groups[1:]), reverse=True)[:2]
+        elif groups[0][0] == 2 and groups[1][0] == 2:
+            # Bei drei Paaren kann das dritte Paar der Kicker sein
+            category, ranks = 2, [groups[0][1], groups[1][1], max(value for _, value in groups[2:])]
+        elif groups[0][0] == 2:
+            category, ranks = 1, [groups[0][1]] + [value for _, value in groups[1:4]]
+        else:
+            category, ranks = 0, [value for _, value in groups[:5]]
+
+    score = category
+    for value in ranks:
+        score = (score << 4) | value
+    return score << 4 * (5 - len(ranks))
+
+
+def best_hand_cards(hand):
+    """
+    Wählt die besten 5 aus 5 oder 7 Karten direkt aus ihrem hand_score, ohne alle 21 Kombinationen zu bewerten.
+    Gibt (score, Karten) zurück; die Karten behalten die Reihenfolge von hand, und unter gleichwertigen Karten
+    werden die zuletzt stehenden gewählt, wie bei der letzten besten Kombination aus combinations(hand, 5).
+    """
+    score = hand_score(hand)
+    category = score >> 20
+    ranks = [(score >> 4 * (4 - i)) & 15 for i in range(5)]
+
+    # Benötigte Anzahl Karten pro Rang
+    if category in (9, 8, 4):
+        needed = {value: 1 for value in range(ranks[0] - 4, ranks[0] + 1)}
+        if ranks[0] == 5:
+            needed[14] = needed.pop(1)
+    else:
+        multiplicities = {7: (4, 1), 6: (3, 2), 3: (3, 1, 1), 2: (2, 2, 1), 1: (2, 1, 1, 1)}
+        needed = dict(zip(ranks, multiplicities.get(category, (1, 1, 1, 1, 1))))
+
+    flush_suit = None
+    if category in (9, 8, 5):
+        suits = Counter(card.suit for card in hand)
+        flush_suit = next(suit for suit, count in suits.items() if count >= 5)
+
+    selected = []
+    for index in range(len(hand) - 1, -1, -1):
+        card = hand[index]
+        value = card.value
+        if needed.get(value) and (flush_suit is None or card.suit == flush_suit):
+            needed[value] -= 1
+            selected.append(index)
+    return score, tuple(hand[index] for index in reversed(selected))
+
+
+def score_hand_type(score):
+    """Liefert den Handtyp von evaluate_hand (1 = Royal Flush ... 10 = High Card) zu einem hand_score."""
+    return 10 - (score >> 20)
 
 
 def has_duplicate_cards(cards):
@@ -198,190 +283,3 @@ def get_hand_description(hand_type, high_cards):
         }
     else:
         return {'hand_type': 'High Card', 'rank_info': {'high_card': high_cards[0].rank}}
-
-
-def tie_breaker(hand_type, challenger_combination, challenger_attr, old_best_attr, old_best_hand):
-    best_hand = old_best_hand
-    # Differentiating tie-breaking logic based on hand type
-    if hand_type in [1, 2, 6]:  # Royal Flush, Straight Flush, Straight
-        split_pot = False
-
-        challenger_high_card = challenger_attr[0]
-        old_high_card = old_best_attr[0]
-        # Compare the highest card in the straight
-        if compare_high_cards(challenger_high_card, old_high_card) > 0:
-            best_hand = (challenger_combination, challenger_attr)
-        elif compare_high_cards(challenger_high_card, old_high_card) == 0:
-            split_pot = True
-            best_hand = (challenger_combination, challenger_attr)
-
-        return best_hand, split_pot
-
-    elif hand_type == 3:  # Four of a Kind
-        split_pot = False
-
-        challenger_rank = challenger_attr[0]
-        old_rank = old_best_attr[0]
-
-        challenger_kicker = challenger_attr[1]
-        old_kicker = old_best_attr[1]
-        # Compare the rank of the Four of a Kind, and then the kicker
-        if rank_value(challenger_rank.rank) > rank_value(old_rank.rank):
-            best_hand = (challenger_combination, challenger_attr)
-        elif rank_value(challenger_rank.rank) == rank_value(old_rank.rank):
-            if compare_high_cards(challenger_kicker, old_kicker) > 0:
-                best_hand = (challenger_combination, challenger_attr)
-            elif compare_high_cards(challenger_kicker, old_kicker) == 0:
-                split_pot = True
-                best_hand = (challenger_combination, challenger_attr)
-
-        return best_hand, split_pot
-
-    elif hand_type == 4:  # Full House
-        # Compare the three of a kind rank, and if equal, compare the pair
-        split_pot = False
-
-        challenger_three_of_a_kind_rank = challenger_attr[0]
-        old_three_of_a_kind_rank = old_best_attr[0]
-
-        challenger_pair_rank = challenger_attr[1]
-        old_pair_rank = old_best_attr[1]
-
-        if rank_value(challenger_three_of_a_kind_rank) > rank_value(old_three_of_a_kind_rank):
-            best_hand = (challenger_combination, challenger_attr)
-        elif rank_value(challenger_three_of_a_kind_rank) == rank_value(old_three_of_a_kind_rank):
-            if rank_value(challenger_pair_rank) > rank_value(old_pair_rank):
-                best_hand = (challenger_combination, challenger_attr)
-            elif rank_value(challenger_pair_rank) == rank_value(old_pair_rank):
-                split_pot = True
-                best_hand = (challenger_combination, challenger_attr)
-
-        return best_hand, split_pot
-
-    elif hand_type == 5 or hand_type == 10:  # Flush
-        # Compare high cards in Flush
-        split_pot = False
-
-        challenger_high_card = challenger_attr[0]
-        old_high_card = old_best_attr[0]
-
-        challenger_kicker_1 = challenger_attr[1]
-        challenger_kicker_2 = challenger_attr[2]
-        challenger_kicker_3 = challenger_attr[3]
-        challenger_kicker_4 = challenger_attr[4]
-
-        old_kicker_1 = old_best_attr[1]
-        old_kicker_2 = old_best_attr[2]
-        old_kicker_3 = old_best_attr[3]
-        old_kicker_4 = old_best_attr[4]
-
-        # Compare the highest card in the straight
-        if compare_high_cards(challenger_high_card, old_high_card) > 0:
-            best_hand = (challenger_combination, challenger_attr)
-        elif compare_high_cards(challenger_high_card, old_high_card) == 0:
-            if compare_high_cards(challenger_kicker_1, old_kicker_1) > 0:
-                best_hand = (challenger_combination, challenger_attr)
-            elif compare_high_cards(challenger_kicker_1, old_kicker_1) == 0:
-                if compare_high_cards(challenger_kicker_2, old_kicker_2) > 0:
-                    best_hand = (challenger_combination, challenger_attr)
-                elif compare_high_cards(challenger_kicker_2, old_kicker_2) == 0:
-                    if compare_high_cards(challenger_kicker_3, old_kicker_3) > 0:
-                        best_hand = (challenger_combination, challenger_attr)
-                    elif compare_high_cards(challenger_kicker_3, old_kicker_3) == 0:
-                        if compare_high_cards(challenger_kicker_4, old_kicker_4) > 0:
-                            best_hand = (challenger_combination, challenger_attr)
-                        elif compare_high_cards(challenger_kicker_4, old_kicker_4) == 0:
-                            split_pot = True
-                            best_hand = (challenger_combination, challenger_attr)
-
-        return best_hand, split_pot
-
-    elif hand_type == 7:  # Three of a Kind
-
-        split_pot = False
-
-        challenger_three_of_a_kind_rank = challenger_attr[0]
-        old_three_of_a_kind_rank = old_best_attr[0]
-
-        # Assume kickers are provided as individual attributes for each kicker rank
-        challenger_kicker_1 = challenger_attr[1]
-        challenger_kicker_2 = challenger_attr[2]
-
-        old_kicker_1 = old_best_attr[1]
-        old_kicker_2 = old_best_attr[2]
-
-        if rank_value(challenger_three_of_a_kind_rank) > rank_value(old_three_of_a_kind_rank):
-            best_hand = (challenger_combination, challenger_attr)
-        elif rank_value(challenger_three_of_a_kind_rank) == rank_value(old_three_of_a_kind_rank):
-            # Compare each kicker directly
-            if challenger_kicker_1 > old_kicker_1:
-                best_hand = (challenger_combination, challenger_attr)
-            elif challenger_kicker_1 == old_kicker_1:
-                if challenger_kicker_2 > old_kicker_2:
-                    best_hand = (challenger_combination, challenger_attr)
-                elif challenger_kicker_2 == old_kicker_2:
-                    split_pot = True
-                    best_hand = (challenger_combination, challenger_attr)
-
-        return best_hand, split_pot
-
-    elif hand_type == 8:  # Two Pair
-        split_pot = False
-
-        challenger_high_pair = challenger_attr[0]
-        old_high_pair = old_best_attr[0]
-
-        challenger_low_pair = challenger_attr[1]
-        old_low_pair = old_best_attr[1]
-
-        challenger_kicker = challenger_attr[2]
-        old_kicker = old_best_attr[2]
-
-        # Compare the higher pair first, then the lower pair, and finally the kicker
-        if rank_value(challenger_high_pair) > rank_value(old_high_pair):
-            best_hand = (challenger_combination, challenger_attr)
-        elif rank_value(challenger_high_pair) == rank_value(old_high_pair):
-            if rank_value(challenger_low_pair) > rank_value(old_low_pair):
-                best_hand = (challenger_combination, challenger_attr)
-            elif rank_value(challenger_low_pair) == rank_value(old_low_pair):
-                if rank_value(challenger_kicker.rank) > rank_value(old_kicker.rank):
-                    best_hand = (challenger_combination, challenger_attr)
-                elif rank_value(challenger_kicker.rank) == rank_value(old_kicker.rank):
-                    split_pot = True
-                    best_hand = (challenger_combination, challenger_attr)
-
-        return best_hand, split_pot
-
-    elif hand_type == 9:  # One Pair
-        split_pot = False
-
-        challenger_pair = challenger_attr[0]
-        old_pair = old_best_attr[0]
-
-        # Assume kickers are provided as individual attributes for each kicker rank
-        challenger_kicker_1 = challenger_attr[1]
-        challenger_kicker_2 = challenger_attr[2]
-        challenger_kicker_3 = challenger_attr[3]
-
-        old_kicker_1 = old_best_attr[1]
-        old_kicker_2 = old_best_attr[2]
-        old_kicker_3 = old_best_attr[3]
-
-        # Compare the pair ranks first, then kickers if pairs are tied
-        if rank_value(challenger_pair) > rank_value(old_pair):
-            best_hand = (challenger_combination, challenger_attr)
-        elif rank_value(challenger_pair) == rank_value(old_pair):
-            # Compare each kicker directly
-            if challenger_kicker_1 > old_kicker_1:
-                best_hand = (challenger_combination, challenger_attr)
-            elif challenger_kicker_1 == old_kicker_1:
-                if challenger_kicker_2 > old_kicker_2:
-                    best_hand = (challenger_combination, challenger_attr)
-                elif challenger_kicker_2 == old_kicker_2:
-                    if challenger_kicker_3 > old_kicker_3:
-                        best_hand = (challenger_combination, challenger_attr)
-                    elif challenger_kicker_3 == old_kicker_3:
-                        split_pot = True
-                        best_hand = (challenger_combination, challenger_attr)
-
-        return best_hand, split_pot
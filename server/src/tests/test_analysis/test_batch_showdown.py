@@ -0,0 +1,85 @@
+import os
+import random
+import tempfile
+import unittest
+
+import numpy as np
+
+from server.src.game.hand_analysis import batch_showdown
+from server.src.game.hand_analysis.batch_showdown import analyze_showdowns, read_showdown_log
+from server.src.game.hand_analysis.winner_determiner import WinnerAnalyzer
+from server.src.game.resources.card import Card, Suit, Rank
+
+
+class TestBatchShowdown(unittest.TestCase):
+
+    def setUp(self):
+        self.deck = [Card(suit, rank) for suit in Suit for rank in Rank]
+
+    def deal(self, rng, num_players):
+        cards = rng.sample(self.deck, 2 * num_players + 5)
+        return [cards[2 * index:2 * index + 2] for index in range(num_players)], cards[-5:]
+
+    def test_matches_winner_analyzer(self):
+        rng = random.Random(0)
+        records = [self.deal(rng, rng.randint(2, 6)) for _ in range(300)]
+        result = analyze_showdowns(records, parallel=False)
+        for index, (hole_cards, board) in enumerate(records):
+            winners = WinnerAnalyzer([(player, cards + board) for player, cards in enumerate(hole_cards)])
+            expected = [winner[0] for winner in winners.analyze_winners()]
+            self.assertEqual(np.flatnonzero(result['winners'][index]).tolist(), expected)
+            self.assertEqual(result['split'][index], len(expected) > 1)
+        # Tables with fewer players are padded
+        self.assertEqual(result['scores'].shape, (300, 6))
+        self.assertTrue((result['hand_types'][result['scores'] < 0] == -1).all())
+
+    def test_split_pot(self):
+        board = ["Ah", "Kh", "Qh", "Jh", "Th"]
+        result = analyze_showdowns([([["2c", "3d"], ["4s", "5c"]], board)], parallel=False)
+        self.assertEqual(result['winners'].tolist(), [[True, True]])
+        self.assertEqual(result['hand_types'].tolist(), [[9, 9]])
+
+    def test_empty_batch(self):
+        result = analyze_showdowns([])
+        self.assertEqual(result['scores'].shape, (0, 0))
+        self.assertEqual(result['winners'].shape, (0, 0))
+        self.assertEqual(result['split'].tolist(), [])
+
+    def test_parallel_chunks(self):
+        rng = random.Random(1)
+        records = [self.deal(rng, 3) for _ in range(200)]
+        chunk_rows = batch_showdown.showdown_chunk_rows
+        batch_showdown.showdown_chunk_rows = 64
+        try:
+            parallel = analyze_showdowns(records)
+        finally:
+            batch_showdown.showdown_chunk_rows = chunk_rows
+        serial = analyze_showdowns(records, parallel=False)
+        for column in serial:
+            np.testing.assert_array_equal(parallel[column], serial[column])
+
+    def test_read_showdown_log(self):
+        # Rows as written by GameRound.save_logs
+        rows = [
+            "round,pot,community_cards,player_cards,player_bets,player_balances",
+            'Flop,30,"ACE of SPADES, KING of SPADES, 2 of HEARTS","Alice: Ah Ad, Bob: 7c 7s","Alice: 10, Bob: 10",'
+            '"Alice: 990, Bob: 990"',
+            'River,60,"ACE of SPADES, KING of SPADES, 2 of HEARTS, 7 of DIAMONDS, 10 of CLUBS",'
+            '"Alice: Ah Ad, Bob: 7c 7s","Alice: 20, Bob: 20","Alice: 970, Bob: 970"',
+            'River,60,"ACE of SPADES, KING of SPADES, 2 of HEARTS, 7 of DIAMONDS, 10 of CLUBS",'
+            '"Alice: Ah Ad","Alice: 20, Bob: 10","Alice: 970, Bob: 980"',
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "poker_game_log.csv")
+            with open(filename, "w") as csvfile:
+                csvfile.write("\n".join(rows) + "\n")
+            names, records = read_showdown_log(filename)
+
+        self.assertEqual(names, [["Alice", "Bob"]])
+        result = analyze_showdowns(records, parallel=False)
+        self.assertEqual(result['winners'].tolist(), [[True, False]])
+        self.assertEqual(result['hand_types'].tolist(), [[3, 3]])
+
+
+if __name__ == '__main__':
+    unittest.main()
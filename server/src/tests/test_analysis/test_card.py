@@ -0,0 +1,53 @@
+import copy
+import pickle
+import random
+import unittest
+
+from server.src.game.resources.card import Card, Suit, Rank, all_cards
+from server.src.game.resources.poker_deck import Deck
+
+
+class TestCard(unittest.TestCase):
+
+    def test_cards_are_interned(self):
+        card = Card(Suit.SPADES, Rank.ACE)
+        self.assertIs(Card(Suit.SPADES, Rank.ACE), card)
+        self.assertIs(copy.deepcopy(card), card)
+        self.assertIs(pickle.loads(pickle.dumps(card)), card)
+        self.assertEqual(len(set(all_cards)), 52)
+
+    def test_cards_are_immutable(self):
+        card = Card(Suit.HEARTS, Rank.TEN)
+        with self.assertRaises(AttributeError):
+            card.rank = Rank.ACE
+        with self.assertRaises(AttributeError):
+            card.owner = "Alice"
+        self.assertEqual((card.abbreviation, card.value), ("Th", 10))
+
+    def test_cards_compare_by_rank(self):
+        self.assertLess(Card(Suit.CLUBS, Rank.NINE), Card(Suit.DIAMONDS, Rank.TEN))
+        self.assertFalse(Card(Suit.CLUBS, Rank.ACE) < Card(Suit.DIAMONDS, Rank.ACE))
+        self.assertEqual([card.value for card in sorted(all_cards)], sorted(card.value for card in all_cards))
+
+
+class TestDeck(unittest.TestCase):
+
+    def test_deal_every_card_once(self):
+        random.seed(0)
+        deck = Deck()
+        deck.shuffle()
+        dealt = [deck.deal_card() for _ in range(52)]
+        self.assertEqual(set(dealt), set(all_cards))
+        self.assertEqual(len(deck), 0)
+        with self.assertRaises(Exception):
+            deck.deal_card()
+
+    def test_cards_left_in_order(self):
+        deck = Deck()
+        top = deck.deal_card()
+        self.assertEqual(len(deck.cards), 51)
+        self.assertNotIn(top, deck.cards)
+
+
+if __name__ == '__main__':
+    unittest.main()
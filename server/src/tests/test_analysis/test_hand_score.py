@@ -0,0 +1,69 @@
+import random
+import unittest
+from itertools import combinations
+
+from server.src.game.resources.card import Card, Suit, Rank
+from server.src.game.utils.game_utils import best_hand_cards, evaluate_hand, hand_score, score_hand_type
+
+
+def cards(*abbreviations):
+    ranks = {rank.value[0] if rank != Rank.TEN else 'T': rank for rank in Rank}
+    suits = {suit.value[0].lower(): suit for suit in Suit}
+    return [Card(suits[card[1]], ranks[card[0]]) for card in abbreviations]
+
+
+class TestHandScore(unittest.TestCase):
+
+    def setUp(self):
+        self.deck = [Card(suit, rank) for suit in Suit for rank in Rank]
+
+    def test_hand_types_match_evaluate_hand(self):
+        rng = random.Random(0)
+        for _ in range(2000):
+            hand = rng.sample(self.deck, 5)
+            self.assertEqual(score_hand_type(hand_score(hand)), evaluate_hand(hand)[0])
+
+    def test_seven_cards_score_best_five(self):
+        rng = random.Random(1)
+        for _ in range(500):
+            hand = rng.sample(self.deck, 7)
+            self.assertEqual(hand_score(hand), max(map(hand_score, combinations(hand, 5))))
+
+    def test_best_hand_cards_match_combinations(self):
+        rng = random.Random(2)
+        hands = [rng.sample(self.deck, 7) for _ in range(1000)]
+        hands += [cards("Ah", "2h", "3h", "4h", "5h", "6d", "Ad"), cards("9h", "9d", "9c", "Ks", "Kh", "Kd", "2c")]
+        for hand in hands:
+            # The last of the equally scored combinations, as the combination search returned
+            expected = max(reversed(list(combinations(hand, 5))), key=hand_score)
+            self.assertEqual(best_hand_cards(hand), (hand_score(hand), expected))
+
+    def test_score_order(self):
+        ordered = [
+            cards("2h", "3d", "4c", "5s", "7h"),  # seven high
+            cards("Ah", "Kd", "Qc", "Js", "9h"),  # ace high
+            cards("2h", "2d", "Ac", "Ks", "Qh"),  # pair of twos
+            cards("2h", "2d", "3c", "3s", "4h"),  # two pair
+            cards("2h", "2d", "2c", "3s", "4h"),  # trips
+            cards("Ah", "2d", "3c", "4s", "5h"),  # wheel
+            cards("2h", "3d", "4c", "5s", "6h"),  # six high straight
+            cards("2h", "3h", "4h", "5h", "7h"),  # flush
+            cards("2h", "2d", "2c", "3s", "3h"),  # full house
+            cards("2h", "2d", "2c", "2s", "3h"),  # quads
+            cards("Ah", "2h", "3h", "4h", "5h"),  # steel wheel
+            cards("Th", "Jh", "Qh", "Kh", "Ah"),  # royal flush
+        ]
+        scores = [hand_score(hand) for hand in ordered]
+        self.assertEqual(scores, sorted(scores))
+        self.assertEqual(len(set(scores)), len(scores))
+
+    def test_three_pairs_use_best_kicker(self):
+        # The third pair beats the single card as kicker
+        self.assertGreater(hand_score(cards("Kh", "Kd", "Qc", "Qs", "Jh", "Jd", "2c")),
+                           hand_score(cards("Kh", "Kd", "Qc", "Qs", "Th", "9d", "2c")))
+        self.assertEqual(hand_score(cards("Kh", "Kd", "Qc", "Qs", "Jh", "Jd", "2c")),
+                         hand_score(cards("Kc", "Ks", "Qh", "Qd", "Js", "3d", "2c")))
+
+
+if __name__ == '__main__':
+    unittest.main()
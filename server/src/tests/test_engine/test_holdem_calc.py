@@ -0,0 +1,173 @@
+import unittest
+
+import os
+import tempfile
+
+from server.src.engine import holdem_argparser, holdem_cache, holdem_calc, holdem_evaluator, holdem_functions, \
+    parallel_holdem_calc
+from server.src.game.resources.card import all_cards
+
+
+class TestHoldemCalc(unittest.TestCase):
+
+    def test_batch_exact_matches_serial(self):
+        board = ["As", "Kd", "7h"]
+        hole_cards = ["8s", "3s", "Ac", "2h", "Td", "Jd"]
+        serial = holdem_calc.calculate(board, True, 1, None, hole_cards, False)
+        batch = holdem_calc.calculate(board, True, 1, None, hole_cards, False, batch=True)
+        self.assertEqual(serial, batch)
+
+    def test_batch_monte_carlo(self):
+        # Aces against a dominated ace win 92.9% of the time (exact enumeration)
+        result = holdem_calc.calculate(None, False, 20000, None, ["Ac", "Ad", "As", "7c"], False, batch=True)
+        self.assertEqual(len(result), 3)
+        self.assertAlmostEqual(sum(result), 1.0)
+        self.assertAlmostEqual(result[1], 0.929, delta=0.02)
+
+    def test_parallel_exact_matches_serial(self):
+        board = ["As", "Kd", "7h"]
+        hole_cards = ["8s", "3s", "Ac", "2h", "Td", "Jd"]
+        serial = holdem_calc.calculate(board, True, 1, None, hole_cards, False)
+        parallel = parallel_holdem_calc.calculate(board, True, 1, None, hole_cards, False)
+        self.assertEqual(serial, parallel)
+
+    def test_calculate_cards_matches_calculate(self):
+        board = ["As", "Kd", "7h", "2c"]
+        hole_cards = ["8s", "3s", "Ac", "2h", "?", "?"]
+        expected = parallel_holdem_calc.calculate(board, True, 1, None, hole_cards, False)
+        codes = [None if card == "?" else holdem_functions.card_to_code(card) for card in hole_cards]
+        game_cards = {card.abbreviation: card for card in all_cards}
+        self.assertEqual(parallel_holdem_calc.calculate_cards(
+            [holdem_functions.card_to_code(card) for card in board], True, 1, None, codes, False), expected)
+        self.assertEqual(parallel_holdem_calc.calculate_cards(
+            [game_cards[card] for card in board], True, 1, None,
+            [game_cards.get(card, card) for card in hole_cards], False), expected)
+        self.assertEqual(parallel_holdem_calc.calculate_cards(None, False, 2000, None, codes[:4], False, seed=1),
+                         parallel_holdem_calc.calculate(None, False, 2000, None, hole_cards[:4], False, seed=1))
+        # Exact queries with several unknown hands are simulated like Monte Carlo ones
+        self.assertEqual(parallel_holdem_calc.calculate_cards(None, True, 2000, None, codes[:2] + [None] * 4, False,
+                                                              seed=1),
+                         parallel_holdem_calc.calculate_cards(None, False, 2000, None, codes[:2] + [None] * 4, False,
+                                                              seed=1))
+        for bad_hole_cards in ([0, 1, 1, 2], [0, 1, 2], [0, 1, 2, 52], [0, None, 2, 3]):
+            with self.assertRaises(ValueError):
+                parallel_holdem_calc.calculate_cards(None, False, 100, None, bad_hole_cards, False)
+
+    def test_input_file_exact_checks(self):
+        hole_cards, _ = holdem_argparser.parse_file_args("As Ks ? ? ? ?", False)
+        self.assertEqual(len(hole_cards), 3)
+        # Exact runs support one unknown hand and no hand ranges, also in input files
+        for line in ("As Ks ? ? ? ?", "As Ks QQ+"):
+            with self.assertRaises(SystemExit):
+                holdem_argparser.parse_file_args(line, True)
+
+    def test_adaptive_monte_carlo(self):
+        board = ["2c", "7d", "9h"]
+        hole_cards = ["As", "Ks", "Qh", "Qd"]
+        exact = holdem_calc.calculate(board, True, 1, None, hole_cards, False)
+        result, intervals = holdem_calc.calculate_adaptive(board, hole_cards, target_error=0.01)
+        self.assertEqual(len(intervals), len(result))
+        for percentage, (low, high) in zip(result, intervals):
+            self.assertLessEqual(high - low, 0.02)
+            self.assertLessEqual(low, percentage)
+            self.assertLessEqual(percentage, high)
+        self.assertAlmostEqual(result[1], exact[1], delta=0.02)
+
+    def test_adaptive_time_budget(self):
+        # An unreachable precision stops at the first batch after the budget
+        _, intervals = holdem_calc.calculate_adaptive(None, ["As", "Ks", "Qh", "Qd"], target_error=0,
+                                                      time_budget=0, batch_size=1000)
+        self.assertGreater(intervals[1][1] - intervals[1][0], 0.02)
+
+    def test_multiple_unknown_hands(self):
+        # Aces win 73.5% of the time against two random hands
+        result = holdem_calc.calculate(None, False, 50000, None, ["As", "Ad", "?", "?", "?", "?"], False)
+        self.assertEqual(len(result), 4)
+        self.assertAlmostEqual(result[1], 0.735, delta=0.015)
+        self.assertAlmostEqual(result[2], result[3], delta=0.015)
+
+    def test_hand_range(self):
+        hand_range = holdem_functions.HandRange("QQ+, AKs:0.5, ATs-A8s, AhKd")
+        self.assertEqual(len(hand_range.combinations), 18 + 4 + 12 + 1)
+        self.assertEqual(hand_range.weights.count(0.5), 4)
+        # A single combination range is the same as known hole cards
+        exact = holdem_calc.calculate(None, True, 1, None, ["As", "Ks", "Qh", "Qd"], False, batch=True)
+        result = holdem_calc.calculate(None, False, 50000, None, ["As", "Ks", "QhQd"], False)
+        self.assertAlmostEqual(result[1], exact[1], delta=0.015)
+        result = parallel_holdem_calc.calculate(None, False, 50000, None, ["JJ", "AKs"], False)
+        self.assertAlmostEqual(result[1], 0.54, delta=0.015)
+
+    def test_seeded_simulations_reproduce(self):
+        hole_cards = ["As", "Ks", "Qh", "Qd"]
+        for batch in (False, True):
+            first = holdem_calc.calculate(None, False, 2000, None, hole_cards, False, batch=batch, seed=7)
+            self.assertEqual(first, holdem_calc.calculate(None, False, 2000, None, hole_cards, False, batch=batch,
+                                                          seed=7))
+            self.assertNotEqual(first, holdem_calc.calculate(None, False, 2000, None, hole_cards, False,
+                                                             batch=batch, seed=8))
+        for calculate in (holdem_calc.calculate, parallel_holdem_calc.calculate):
+            self.assertEqual(calculate(None, False, 5000, None, ["JJ", "?", "?"], False, seed=3),
+                             calculate(None, False, 5000, None, ["JJ", "?", "?"], False, seed=3))
+        self.assertEqual(parallel_holdem_calc.calculate(None, False, 5000, None, hole_cards, False, seed=3),
+                         parallel_holdem_calc.calculate(None, False, 5000, None, hole_cards, False, seed=3))
+        self.assertEqual(holdem_calc.calculate_adaptive(None, hole_cards, target_error=0.02, seed=5),
+                         holdem_calc.calculate_adaptive(None, hole_cards, target_error=0.02, seed=5))
+
+    def test_isomorphic_exact_matches_serial(self):
+        # Hearts and diamonds can be swapped without changing any outcome
+        board = ["2c", "7s", "9c"]
+        hole_cards = ["As", "Ks", "Qh", "Qd"]
+        serial = holdem_calc.calculate(board, True, 1, None, hole_cards, False)
+        batch = holdem_calc.calculate(board, True, 1, None, hole_cards, False, batch=True)
+        self.assertEqual(serial, batch)
+
+    def test_suit_symmetries(self):
+        hole_cards = holdem_functions.encode_hole_cards([("As", "Ad"), ("Kc", "Kh")])
+        self.assertEqual(len(holdem_functions.suit_symmetries(hole_cards, None)), 4)
+        # Every class of boards is counted once for each board in it
+        deck = holdem_functions.generate_deck(hole_cards, None)
+        boards = next(holdem_functions.generate_exhaustive_board_batches(deck, 1, 3, 100000))
+        masks = holdem_evaluator.codes_to_mask_array(boards)
+        is_canonical, weights = holdem_functions.canonical_board_weights(
+            masks, holdem_functions.suit_symmetries(hole_cards, None))
+        self.assertEqual(weights[is_canonical].sum(), len(boards))
+
+    def test_cache_normalizes_query(self):
+        cache = holdem_cache.EquityCache()
+        board = ["As", "Kd", "7h"]
+        result = cache.calculate(board, True, 1, None, ["8s", "3s", "Ac", "2h"], False, holdem_calc.calculate)
+        # Same spot with suits relabelled, players swapped and cards reordered
+        swapped = cache.calculate(["Kc", "7s", "Ah"], True, 1, None, ["2s", "Ad", "3h", "8h"], False,
+                                  holdem_calc.calculate)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(swapped, [result[0], result[2], result[1]])
+
+    def test_cache_lru_and_persistence(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_name = os.path.join(directory, "equity.json")
+            cache = holdem_cache.EquityCache(max_size=1, file_name=file_name)
+            cache.calculate(["As", "Kd", "7h"], True, 1, None, ["8s", "3s", "Ac", "2h"], False, holdem_calc.calculate)
+            cache.calculate(["As", "Kd", "7h"], True, 1, None, ["8s", "3s", "Tc", "2h"], False, holdem_calc.calculate)
+            self.assertEqual(len(cache), 1)
+            cache.save()
+            loaded = holdem_cache.EquityCache(file_name=file_name)
+            loaded.calculate(["As", "Kd", "7h"], True, 1, None, ["8s", "3s", "Tc", "2h"], False, holdem_calc.calculate)
+            self.assertEqual((loaded.hits, loaded.misses), (1, 0))
+            self.assertEqual(list(loaded.entries.items()), list(cache.entries.items()))
+            # Saved caches are plain JSON, and other files are ignored
+            with open(file_name, "w") as cache_file:
+                cache_file.write("not a cache")
+            self.assertEqual(len(holdem_cache.EquityCache(file_name=file_name)), 0)
+
+    def test_cache_leaves_invalid_hands_to_calculate(self):
+        cache = holdem_cache.EquityCache()
+        with self.assertRaises(SystemExit):
+            cache.calculate(["As", "Kd", "7h"], False, 100, None, ["As", "?", "Kh", "Kc"], False,
+                            holdem_calc.calculate)
+        with self.assertRaises(ValueError):
+            holdem_cache.canonical_query(["As", "?"], None)
+        self.assertEqual(len(cache), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
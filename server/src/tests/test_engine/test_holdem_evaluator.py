@@ -0,0 +1,89 @@
+import random
+import unittest
+
+from server.src.engine import holdem_evaluator
+from server.src.engine.holdem_functions import Card, reverse_suit_index, val_string, cards_to_mask, \
+    code_to_string, card_to_code
+
+
+class TestHoldemEvaluator(unittest.TestCase):
+
+    def create_cards(self, card_strings):
+        """Helper function to create cards from strings like "As Kd"."""
+        return [Card(card) for card in card_strings.split()]
+
+    def evaluate(self, card_strings):
+        return holdem_evaluator.evaluate_mask(cards_to_mask(self.create_cards(card_strings)))
+
+    def test_hand_types(self):
+        hands = {
+            "Ah Kh Qh Jh Th 2c 3d": 9,
+            "5h 4h 3h 2h Ah Kc Kd": 8,
+            "9s 9h 9d 9c As Ks Kh": 7,
+            "9s 9h 9d Ac As Ad 2h": 6,
+            "2h 7h 9h Jh Kh Ac As": 5,
+            "Ac 2d 3h 4s 5c Kd Kh": 4,
+            "7c 7d 7h Ks 2c 4d 9h": 3,
+            "7c 7d 2h 2s Ac Ad 9h": 2,
+            "7c 7d 2h 3s Jc Qd 9h": 1,
+            "7c 8d 2h 3s Jc Qd Ah": 0,
+        }
+        for hand, expected_type in hands.items():
+            score = self.evaluate(hand)
+            self.assertEqual(holdem_evaluator.hand_type(score), expected_type, hand)
+
+    def test_kickers(self):
+        evaluate = self.evaluate
+        # Three pairs: the third pair plays as the kicker
+        self.assertGreater(evaluate("Ac Ad Kh Ks Qc Qd 2h"), evaluate("Ac Ad Kh Ks Jc Td 2h"))
+        # The wheel is the lowest straight
+        self.assertLess(evaluate("Ac 2d 3h 4s 5c"), evaluate("2d 3h 4s 5c 6c"))
+        # Identical values in different suits split the pot
+        self.assertEqual(evaluate("Ac Kd 9h 7s 3c 2d 4h"), evaluate("Ad Kc 9s 7h 3d 2h 4c"))
+
+    def test_matches_exhaustive_evaluation(self):
+        rng = random.Random(0)
+        for _ in range(2000):
+            codes = rng.sample(range(52), rng.choice([5, 6, 7]))
+            self.assertEqual(holdem_evaluator.evaluate_mask(cards_to_mask(codes)),
+                             holdem_evaluator.evaluate_exhaustive(codes), codes)
+
+    def test_card_codes(self):
+        for suit in reverse_suit_index:
+            for value in val_string:
+                card = Card(value + suit)
+                self.assertEqual(card_to_code(value + suit), card.code)
+                self.assertEqual(code_to_string(card.code), value + suit)
+
+    def test_mask_evaluation(self):
+        deck = [Card(value + suit) for suit in reverse_suit_index for value in val_string]
+        rng = random.Random(2)
+        for _ in range(2000):
+            cards = rng.sample(deck, 7)
+            score = holdem_evaluator.evaluate_mask(cards_to_mask(cards))
+            self.assertEqual(int(holdem_evaluator.evaluate_mask_array([cards_to_mask(cards)])[0]), score, cards)
+            hole_mask, board_mask = cards_to_mask(cards[:2]), cards_to_mask(cards[2:])
+            board_key, flush_shift, flush_mask = holdem_evaluator.preprocess_board_mask(board_mask)
+            self.assertEqual(holdem_evaluator.evaluate_hole_mask(hole_mask, holdem_evaluator.mask_key(hole_mask),
+                                                                 board_key, flush_shift, flush_mask),
+                             score, cards)
+
+    def test_short_deck_rules(self):
+        def short_score(card_strings):
+            return int(holdem_evaluator.evaluate_mask_array([cards_to_mask(self.create_cards(card_strings))],
+                                                            short_deck=True)[0])
+        flush = short_score("6h 8h 9h Jh Kh Ac As")
+        full_house = short_score("9s 9h 9d Ac As Ad 6h")
+        self.assertGreater(flush, full_house)
+        self.assertEqual(holdem_evaluator.hand_type(flush, short_deck=True), 5)
+        self.assertEqual(holdem_evaluator.hand_type(full_house, short_deck=True), 6)
+        # A-6-7-8-9 is the lowest straight, below 6-7-8-9-T
+        wheel = short_score("Ac 6d 7h 8s 9c Kd Jh")
+        self.assertEqual(holdem_evaluator.hand_type(wheel, short_deck=True), 4)
+        self.assertLess(wheel, short_score("6d 7h 8s 9c Td Kd Jh"))
+        self.assertGreater(wheel, short_score("Ac Ad Ah 8s 9c Kd Jh"))
+        self.assertEqual(holdem_evaluator.hand_type(short_score("Ah 6h 7h 8h 9h Kd Jh"), short_deck=True), 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from server.src.engine import holdem_calc, holdem_functions, holdem_preflop
+
+
+class TestHoldemPreflop(unittest.TestCase):
+
+    def test_hand_classes(self):
+        for index in range(169):
+            self.assertEqual(holdem_preflop.hand_class(holdem_preflop.class_hole_cards(index)), index)
+        names = [holdem_preflop.class_name(index) for index in range(169)]
+        self.assertEqual(len(set(names)), 169)
+        self.assertEqual(names[0], "AA")
+        ace_king = [holdem_functions.card_to_code(card) for card in ("Ad", "Kd")]
+        self.assertEqual(holdem_preflop.class_name(holdem_preflop.hand_class(ace_king)), "AKs")
+
+    def test_matchup_key(self):
+        codes = [holdem_functions.card_to_code(card) for card in ("As", "Ks", "Qh", "Qd", "Ac", "Kc", "Qs", "Qd")]
+        key, swapped = holdem_preflop.matchup_key(codes[0:2], codes[2:4])
+        # Same matchup with suits relabelled and the hands in the other order
+        other_key, other_swapped = holdem_preflop.matchup_key(codes[6:8], codes[4:6])
+        self.assertEqual(key, other_key)
+        self.assertNotEqual(swapped, other_swapped)
+
+    def test_simulate_vs_random(self):
+        # Aces win 85% against one random hand
+        win, tie = holdem_preflop.simulate_vs_random(holdem_preflop.class_hole_cards(0), 1, 20000, seed=1)
+        self.assertAlmostEqual(win + tie / 2, 0.852, delta=0.01)
+        # Ties count every shared best hand, also between opponents, as in calculate
+        hole_cards = [holdem_functions.card_to_code(card) for card in ("7s", "2c")]
+        win, tie = holdem_preflop.simulate_vs_random(hole_cards, 5, 20000, seed=1)
+        result = holdem_calc.calculate(None, False, 20000, None, ["7s", "2c"] + ["?"] * 10, False, seed=1)
+        self.assertAlmostEqual(win, result[1], delta=0.01)
+        self.assertAlmostEqual(tie, result[0], delta=0.01)
+
+    @unittest.skipIf(holdem_preflop.vs_random_table is None, "pre-flop tables not built")
+    def test_lookup(self):
+        # Exact equity of AsKs against QhQd is 46.0% / 53.6% with 0.4% ties
+        result = holdem_preflop.lookup(["Qh", "Qd", "As", "Ks"], 10000)
+        self.assertAlmostEqual(result[1], 0.536, delta=0.01)
+        self.assertAlmostEqual(result[2], 0.460, delta=0.01)
+        self.assertTrue(all(type(percentage) is float for percentage in result))
+        result = holdem_preflop.lookup(["?", "?", "Ac", "Ad", "?", "?"])
+        self.assertEqual(len(result), 4)
+        self.assertAlmostEqual(sum(result), 1.0, places=5)
+        self.assertAlmostEqual(result[2], 0.735, delta=0.02)
+        self.assertIsNone(holdem_preflop.lookup(["Ac", "Ad", "Ac", "Kd"]))
+        # Queries asking for more simulations than the tables were built with are left to the calculators
+        vs_random_iterations, heads_up_iterations = [int(num) for num in holdem_preflop.table_iterations]
+        self.assertIsNone(holdem_preflop.lookup(["Qh", "Qd", "As", "Ks"], heads_up_iterations + 1))
+        self.assertIsNone(holdem_preflop.lookup(["Ac", "Ad", "?", "?"], vs_random_iterations + 1))
+
+    def test_write_heatmap_keeps_symbols(self):
+        table = np.zeros((169, holdem_preflop.max_players - 1, 2))
+        table[:, 0, 0] = np.linspace(0.8, 0.3, 169)
+        with tempfile.TemporaryDirectory() as directory:
+            file_name = os.path.join(directory, "HeatMapData.py")
+            holdem_preflop.write_heatmap(file_name, table)
+            with open(file_name) as heatmap_file:
+                heatmap_data = json.loads(heatmap_file.read().split("=", 1)[1])
+            self.assertEqual(heatmap_data[0], {"x": "A", "y": "A", "heat": 0.8, "symbol": "\n 0"})
+            self.assertEqual(heatmap_data[1]["symbol"], "o\n 1")
+            # Regenerating refreshes the heat values only
+            heatmap_data[1]["symbol"] = "o\n 5"
+            with open(file_name, "w") as heatmap_file:
+                heatmap_file.write("heatmap_data = " + json.dumps(heatmap_data, indent=4) + "\n")
+            table[1, 0, 0] = 0.7
+            holdem_preflop.write_heatmap(file_name, table)
+            with open(file_name) as heatmap_file:
+                heatmap_data = json.loads(heatmap_file.read().split("=", 1)[1])
+            self.assertEqual(heatmap_data[1], {"x": "A", "y": "K", "heat": 0.7, "symbol": "o\n 5"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+
+import numpy as np
+
+from server.src.engine import holdem_evaluator
+from server.src.engine.ranker import Ranker, short_rules
+from server.src.engine.utils import card_str_to_arr, comb_index
+
+
+class TestRanker(unittest.TestCase):
+
+    def test_rank_direct_matches_all_hands(self):
+        rng = np.random.default_rng(0)
+        deck = card_str_to_arr([n + s for n in "23456789TJQKA" for s in "dcsh"])
+        hands = deck[np.argsort(rng.random((20000, 52)), axis=1)[:, :7]]
+        expected = Ranker.rank_all_hands(hands[:, comb_index(7, 5), :].copy())
+        np.testing.assert_array_equal(Ranker.rank_direct(hands), expected)
+
+    def test_rank_direct_hand_types(self):
+        hands = np.array([card_str_to_arr(cards.split()) for cards in [
+            "Ah 2d 3c 4s 5h Kd Kc",  # wheel beats a pair
+            "6h 7h 8h 9h Th 2h 2d",  # straight flush beats a flush
+            "Ah Ad Ac Kh Kd Kc 2s",  # two trips make a full house
+            "9h 9d 9c 9s Kh Kd Ac",  # four of a kind with an ace kicker
+            "2h 2d 3c 3s 4h 4d Ac",  # three pairs keep the ace as kicker
+        ]])
+        ranks = Ranker.rank_direct(hands)
+        self.assertEqual((ranks // 16 ** 5).tolist(), [4, 8, 6, 7, 2])
+        self.assertEqual(ranks[3] % 16, 14)
+        self.assertEqual(ranks[4] % 16, 14)
+
+    def test_rank_direct_short_deck(self):
+        hands = np.array([card_str_to_arr(cards.split()) for cards in [
+            "Ah 6d 7c 8s 9h Kd Kc",  # A6789 straight beats a pair
+            "6h 8h 9h Jh Kh As Ac",  # flush
+            "9h 9d 9c As Ah Ad 6c",  # full house loses to the flush
+            "6h 7d 8c 9s Th Jd Qc",  # queen high straight
+        ]])
+        ranks = Ranker.rank_direct(hands, short_rules)
+        self.assertEqual([short_rules.hand_type_dict[rank] for rank in (ranks // 16 ** 5).tolist()],
+                         ['Straight', 'Flush', 'Full House', 'Straight'])
+        self.assertGreater(ranks[1], ranks[2])
+        self.assertLess(ranks[0], ranks[3])
+
+    def test_rank_direct_short_deck_matches_evaluator(self):
+        rng = np.random.default_rng(1)
+        deck = card_str_to_arr([n + s for n in "6789TJQKA" for s in "dcsh"])
+        hands = deck[np.argsort(rng.random((20000, 36)), axis=1)[:, :7]]
+        ranks = Ranker.rank_direct(hands, short_rules)
+        scores = holdem_evaluator.evaluate_mask_array(holdem_evaluator.codes_to_mask_array(
+            hands[:, :, 1] * 13 + hands[:, :, 0] - 2), short_deck=True)
+        # Both rank the hands in the same order
+        np.testing.assert_array_equal(np.sign(ranks[::2] - ranks[1::2]), np.sign(scores[::2] - scores[1::2]))
+
+
+if __name__ == '__main__':
+    unittest.main()
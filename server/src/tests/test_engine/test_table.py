@@ -0,0 +1,155 @@
+import multiprocessing
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from server.src.engine import parallel_holdem_calc, table
+from server.src.engine.ranker import Ranker
+from server.src.engine.table import Engine, OmahaEngine
+from server.src.engine.utils import card_str_to_arr, comb_index
+
+
+class TestEngine(unittest.TestCase):
+
+    def deal(self, player_cards, community_cards="", seed=None):
+        engine = Engine(len(player_cards), seed=seed)
+        for player, cards in enumerate(player_cards):
+            engine.add_to_hand(player + 1, cards.split())
+        if community_cards:
+            engine.add_to_community(community_cards.split())
+        return engine
+
+    def test_streaming_matches_exhaustive(self):
+        engine = self.deal(["Ah Kd", "Qs Qc"], "2h 7c Ts")
+        expected = engine.simulate(num_scenarios='all', odds_type="precise", final_hand=True)
+        for chunk_size in (100, 1000):
+            self.assertEqual(engine.simulate(num_scenarios='all', odds_type="precise", final_hand=True,
+                                             chunk_size=chunk_size), expected)
+
+    def test_streaming_random_scenarios(self):
+        engine = self.deal(["Ah Ad", "7s 2c"], seed=0)
+        outcome_dict = engine.simulate(num_scenarios=20000, odds_type="win_any", chunk_size=3000)
+        # Aces win 88% against seven-deuce offsuit
+        self.assertAlmostEqual(outcome_dict["Player 1"], 88, delta=1.5)
+        self.assertAlmostEqual(sum(outcome_dict.values()), 100, delta=0.1)
+
+    def test_seeded_engines_reproduce(self):
+        results = []
+        for _ in range(2):
+            engine = self.deal(["Ah Kd", "Qs Qc"], seed=11)
+            engine.next_round(verbose=False)
+            results.append((engine.view_table(), engine.simulate(5000), engine.simulate(5000, chunk_size=1000)))
+        self.assertEqual(results[0], results[1])
+
+    def test_undrawn_combo_chunks(self):
+        engine = self.deal(["Ah Ad", "7s 2c"], "2h 7c Ts 9d")
+        chunks = list(engine.undrawn_combo_chunks(1000, 10))
+        self.assertEqual([len(chunk) for chunk in chunks], [10, 10, 10, 10, 4])
+        engine.add_to_community(["3d"])
+        self.assertEqual([chunk.shape for chunk in engine.undrawn_combo_chunks(1000, 10)], [(1, 0, 2)])
+
+    def test_parallel_shards_match_threads(self):
+        engine = self.deal(["Ah Kd", "Qs Qc", "7h 8h"], "2h 9h Tc")
+        community_cards, undrawn_combos = engine.simulation_preparation('all')
+        expected = engine.simulate_calculation(community_cards, undrawn_combos)
+        engine.parallel = True
+        np.testing.assert_array_equal(engine.simulate_calculation_parallel(undrawn_combos, 3), expected)
+
+    def test_sharded_simulation_with_two_workers(self):
+        engine = self.deal(["Ah Kd", "Qs Qc", "7h 8h"], "2h 9h Tc")
+        community_cards, undrawn_combos = engine.simulation_preparation('all')
+        expected = engine.simulate_calculation(community_cards, undrawn_combos)
+        engine.parallel = True
+        parallel_holdem_calc.shutdown_pool()
+        try:
+            with mock.patch.object(table, "min_shard_rows", 100), \
+                    mock.patch.object(multiprocessing, "cpu_count", return_value=2), \
+                    mock.patch.object(engine, "simulate_calculation_parallel",
+                                      wraps=engine.simulate_calculation_parallel) as sharded:
+                # Workers attach to the blocks of every call, and only the parent unlinks them
+                for _ in range(2):
+                    np.testing.assert_array_equal(engine.simulate_calculation(community_cards, undrawn_combos),
+                                                  expected)
+            sharded.assert_called_with(undrawn_combos, 2)
+        finally:
+            parallel_holdem_calc.shutdown_pool()
+
+    def test_simulate_incremental(self):
+        engine = self.deal(["Ah Kd", "Qs Qc"], "2h 7c Ts")
+        self.assertEqual(engine.simulate_incremental('all', odds_type="precise"),
+                         engine.simulate('all', odds_type="precise"))
+        engine.add_to_community(["Kh"])
+        # Every turn completion was evaluated on the flop, so the turn reuses them and is exact
+        with mock.patch.object(engine, "simulate_calculation", side_effect=AssertionError):
+            turn_dict = engine.simulate_incremental('all', odds_type="precise")
+        self.assertEqual(turn_dict, engine.simulate('all', odds_type="precise"))
+        self.assertEqual(len(engine.scenario_cache["res_arr"]), 44)
+        engine.add_to_community(["3d"])
+        self.assertEqual(engine.simulate_incremental('all', odds_type="precise"),
+                         engine.simulate('all', odds_type="precise"))
+        self.assertEqual(engine.scenario_cache["undrawn_combos"].shape, (1, 0, 2))
+
+    def test_simulate_incremental_resamples(self):
+        engine = self.deal(["Ah Kd", "Qs Qc"])
+        engine.simulate_incremental(2000)
+        engine.add_to_community(["2h", "7c", "Ts"])
+        # Too few pre-flop scenarios contain the flop, so the flop is sampled again
+        engine.simulate_incremental(2000, min_scenarios=500)
+        self.assertEqual(len(engine.scenario_cache["res_arr"]), 990)
+
+    def test_precise_outcome_counts(self):
+        engine = Engine(9)
+        res_arr = np.random.default_rng(0).integers(0, 3, size=(5000, 9))
+        outcome_counts = engine.outcome_counts("precise", res_arr)
+        self.assertEqual(len(outcome_counts), 2 ** 9 - 1)
+        self.assertEqual(sum(outcome_counts.values()), 5000)
+        winners = res_arr == res_arr.max(axis=1, keepdims=True)
+        self.assertEqual(outcome_counts["Player 3 Win"], np.sum(winners[:, 2] & (winners.sum(axis=1) == 1)))
+        self.assertEqual(outcome_counts["Player 1,4,9 Tie"],
+                         np.sum(np.all(winners == np.isin(np.arange(9), [0, 3, 8]), axis=1)))
+
+    def test_short_deck_engine(self):
+        for rules, winner in (None, "Player 1 wins with a Flush"), ("full", "Player 2 wins with a Full House"):
+            engine = Engine(2, deck_type="short", rules=rules)
+            engine.add_to_hand(1, ["Ah", "Kh"])
+            engine.add_to_hand(2, ["9s", "9d"])
+            engine.add_to_community(["9h", "Ad", "Qh", "Th", "Ac"])
+            # The heart flush beats the full house of nines only by short deck rules
+            self.assertEqual(engine.view_result(), winner)
+            outcome_dict, final_hand_dict = engine.simulate('all', final_hand=True)
+            self.assertEqual(outcome_dict[winner[:8] + " Win"], 100)
+            self.assertEqual(final_hand_dict[1], {'Flush': 100})
+
+
+class TestOmahaEngine(unittest.TestCase):
+
+    def test_two_hole_cards(self):
+        engine = OmahaEngine(2)
+        engine.add_to_hand(1, ["Th", "3d", "4d", "5d"])
+        engine.add_to_hand(2, ["9c", "9s", "2d", "7s"])
+        engine.add_to_community(["Ah", "Kh", "Qh", "Jh", "2c"])
+        # A single heart doesn't make a royal flush: exactly two hole cards play
+        self.assertEqual(engine.view_hand()["Player 1 Current Hand"].split()[:2], ["High", "Card"])
+        self.assertEqual(engine.view_result(), "Player 2 wins with a One Pair")
+
+    def test_rank_omaha_matches_brute_force(self):
+        rng = np.random.default_rng(2)
+        deck = card_str_to_arr([n + s for n in "23456789TJQKA" for s in "dcsh"])
+        hands = deck[np.argsort(rng.random((300, 52)), axis=1)[:, :9]]
+        hand_idx = [list(hole) + list(4 + community) for hole in comb_index(4, 2) for community in comb_index(5, 3)]
+        expected = Ranker.rank_all_hands(hands[:, hand_idx, :].copy())
+        np.testing.assert_array_equal(Ranker.rank_omaha(hands), expected)
+
+    def test_simulate(self):
+        engine = OmahaEngine(2)
+        engine.add_to_hand(1, ["Ah", "As", "Kh", "Ks"])
+        engine.add_to_hand(2, ["7c", "8d", "2h", "3s"])
+        engine.add_to_community(["Qd", "Jc", "4h"])
+        outcome_dict = engine.simulate('all')
+        self.assertEqual(outcome_dict, engine.simulate('all', chunk_size=100))
+        self.assertGreater(outcome_dict["Player 1 Win"], 80)
+
+
+if __name__ == '__main__':
+    unittest.main()
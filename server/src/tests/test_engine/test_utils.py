@@ -0,0 +1,69 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from server.src.engine import utils
+from server.src.engine.exceptions import CardException, DeckException
+
+
+class TestCombIndex(unittest.TestCase):
+
+    def test_comb_index_registry(self):
+        index = utils.comb_index(7, 5)
+        self.assertEqual(index.shape, (21, 5))
+        self.assertIs(utils.comb_index(7, 5), index)
+        self.assertFalse(index.flags.writeable)
+
+    def test_comb_index_file(self):
+        directory, mmap_rows = utils.comb_index_directory, utils.comb_index_mmap_rows
+        with tempfile.TemporaryDirectory() as temp_directory:
+            utils.comb_index_directory, utils.comb_index_mmap_rows = temp_directory, 100
+            try:
+                index = utils.comb_index(20, 3)
+                self.assertTrue(os.path.exists(os.path.join(temp_directory, "comb_index_20_3.npy")))
+                del utils.comb_index_registry[(20, 3)]
+                self.assertEqual(utils.comb_index(20, 3).tolist(), index.tolist())
+                self.assertEqual(index.tolist(), utils.build_comb_index(20, 3).tolist())
+            finally:
+                utils.comb_index_registry.pop((20, 3), None)
+                utils.comb_index_directory, utils.comb_index_mmap_rows = directory, mmap_rows
+
+
+class TestDeck(unittest.TestCase):
+
+    def test_card_slots(self):
+        self.assertEqual(utils.card_slots(["2d", "Ah", "Tc"]).tolist(), [0, 51, 33])
+        self.assertEqual(utils.card_slots(np.array([14, 3])).tolist(), [51])
+        self.assertEqual(utils.card_slots(utils.card_str_to_arr(["Ks", "3c"])).tolist(), utils.card_slots(["Ks", "3c"]).tolist())
+        with self.assertRaises(CardException):
+            utils.card_slots(["Ax"])
+
+    def test_deck(self):
+        deck = utils.Deck()
+        np.testing.assert_array_equal(deck.card_arr, utils.card_str_to_arr([n + s for n in "23456789TJQKA" for s in "dcsh"]))
+        deck.remove(["Ah", "2d"])
+        self.assertEqual(len(deck), 50)
+        self.assertNotIn("Ah", deck)
+        self.assertEqual(len(deck.card_arr), 50)
+        with self.assertRaises(DeckException):
+            deck.remove(["Kd", "Ah"])
+        self.assertIn("Kd", deck)
+        deck.add("Ah")
+        self.assertIn("Ah", deck)
+        self.assertEqual(len(utils.Deck("short")), 36)
+
+    def test_deck_rejects_invalid_cards(self):
+        deck = utils.Deck()
+        # [value, suit] cards outside 2-14 and 0-3 would otherwise map to another card's slot
+        for card in ([1, 0], [2, 5], [15, 0], [2, -1]):
+            with self.assertRaises(CardException):
+                deck.remove([card])
+            with self.assertRaises(CardException):
+                deck.add([card])
+        self.assertEqual(len(deck), 52)
+
+
+if __name__ == '__main__':
+    unittest.main()